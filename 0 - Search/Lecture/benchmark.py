@@ -0,0 +1,314 @@
+"""
+Benchmarks for the maze search code.
+
+Usage: python benchmark.py frontier
+       python benchmark.py solvers maze.txt [maze.txt ...]
+       python benchmark.py backend [size ...]
+       python benchmark.py suite results.json [--baseline baseline.json]
+                                 [--sizes 100,300,1000] [--kinds backtracker,rooms,noise]
+                                 [--algorithms dfs,bfs,...] [--tolerance 0.25]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import generate
+from maze import ALGORITHMS, CompactMaze, Maze, Node, StackFrontier, QueueFrontier
+
+# Timing differences smaller than this are not counted as regressions
+NOISE_SECONDS = 0.005
+
+# IDA* re-expands states exponentially often in open rooms, so the suite
+# only runs it when asked to
+SUITE_ALGORITHMS = tuple(algorithm for algorithm in ALGORITHMS if algorithm != "idastar")
+
+
+class ListStackFrontier():
+    """
+    The original list-backed stack frontier, kept for comparison.
+    """
+
+    def __init__(self):
+        self.frontier = []
+
+    def add(self, node):
+        self.frontier.append(node)
+
+    def contains_state(self, state):
+        return any(node.state == state for node in self.frontier)
+
+    def empty(self):
+        return len(self.frontier) == 0
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            node = self.frontier[-1]
+            self.frontier = self.frontier[:-1]
+            return node
+
+
+class ListQueueFrontier(ListStackFrontier):
+    """
+    The original list-backed queue frontier, kept for comparison.
+    """
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            node = self.frontier[0]
+            self.frontier = self.frontier[1:]
+            return node
+
+
+def open_grid_search(frontier, size):
+    """
+    Runs the same search loop as `Maze.solve` over an open `size` x `size`
+    grid from one corner to the other, using the given frontier.
+    Returns the number of states explored.
+    """
+    goal = (size - 1, size - 1)
+    frontier.add(Node(state=(0, 0), parent=None, action=None))
+    explored = set()
+    num_explored = 0
+    while not frontier.empty():
+        node = frontier.remove()
+        num_explored += 1
+        if node.state == goal:
+            return num_explored
+        explored.add(node.state)
+        row, col = node.state
+        for state in ((row - 1, col), (row + 1, col), (row, col - 1), (row, col + 1)):
+            r, c = state
+            if 0 <= r < size and 0 <= c < size:
+                if not frontier.contains_state(state) and state not in explored:
+                    frontier.add(Node(state=state, parent=node, action=None))
+    return num_explored
+
+
+def benchmark_frontier(sizes=(25, 50, 100, 200), limit=5.0):
+    """
+    Times breadth-first and depth-first search on open grids of growing size
+    with both the original and the indexed frontiers. The original classes
+    are skipped once a single run takes longer than `limit` seconds.
+    """
+    pairs = [
+        ("bfs", ListQueueFrontier, QueueFrontier),
+        ("dfs", ListStackFrontier, StackFrontier),
+    ]
+    print(f"{'search':<8}{'size':>8}{'explored':>12}{'list (s)':>12}{'indexed (s)':>14}")
+    for name, old, new in pairs:
+        too_slow = False
+        for size in sizes:
+            old_time = None
+            if not too_slow:
+                start = time.perf_counter()
+                open_grid_search(old(), size)
+                old_time = time.perf_counter() - start
+                too_slow = old_time > limit
+
+            start = time.perf_counter()
+            explored = open_grid_search(new(), size)
+            new_time = time.perf_counter() - start
+
+            old_text = f"{old_time:.4f}" if old_time is not None else "skipped"
+            print(f"{name:<8}{size:>8}{explored:>12}{old_text:>12}{new_time:>14.4f}")
+
+
+def benchmark_solvers(filenames, algorithms=ALGORITHMS):
+    """
+    Solves each maze file with every algorithm and prints how many states
+    each one explored, the solution length and the time taken.
+    """
+    print(f"{'maze':<20}{'algorithm':<15}{'explored':>12}{'length':>10}{'time (s)':>12}")
+    for filename in filenames:
+        maze = Maze(filename)
+        for algorithm in algorithms:
+            start = time.perf_counter()
+            maze.solve(algorithm)
+            elapsed = time.perf_counter() - start
+            length = len(maze.solution[0])
+            print(f"{filename:<20}{algorithm:<15}{maze.num_explored:>12}{length:>10}{elapsed:>12.4f}")
+
+
+def write_noise_maze(filename, size, density=0.2, seed=0):
+    """
+    Writes a `size` x `size` maze of randomly placed walls, with the start
+    and goal in opposite corners.
+    """
+    maze = generate.generate("noise", size, seed=seed, density=density)
+    generate.write(maze, size, filename)
+
+
+def benchmark_backend(sizes=(200, 1000, 2000), algorithms=("bfs", "astar")):
+    """
+    Loads and solves random mazes with both the list and the compact
+    backends, the latter from text and from a packed binary file, printing
+    the memory held by each loaded maze, the load time and the time each
+    algorithm takes.
+    """
+    print(f"{'backend':<10}{'size':>8}{'memory (MB)':>14}{'load (s)':>10}", end="")
+    for algorithm in algorithms:
+        print(f"{algorithm + ' (s)':>14}", end="")
+    print()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            filename = os.path.join(directory, f"noise{size}.txt")
+            write_noise_maze(filename, size)
+            packed = os.path.join(directory, f"noise{size}.bin")
+            CompactMaze(filename).save_binary(packed)
+            backends = [
+                ("list", Maze, filename),
+                ("compact", CompactMaze, filename),
+                ("binary", CompactMaze, packed)
+            ]
+            for name, backend, source in backends:
+
+                # Measure memory in a separate load, since tracing slows it down
+                tracemalloc.start()
+                maze = backend(source)
+                memory = tracemalloc.get_traced_memory()[0] / 2 ** 20
+                tracemalloc.stop()
+                del maze
+
+                start = time.perf_counter()
+                maze = backend(source)
+                load = time.perf_counter() - start
+                print(f"{name:<10}{size:>8}{memory:>14.1f}{load:>10.3f}", end="")
+
+                for algorithm in algorithms:
+                    start = time.perf_counter()
+                    try:
+                        maze.solve(algorithm)
+                        print(f"{time.perf_counter() - start:>14.3f}", end="")
+                    except Exception:
+                        print(f"{'no solution':>14}", end="")
+                print()
+                del maze
+
+
+def benchmark_suite(results_file, baseline_file=None, sizes=(100, 300, 1000),
+                    kinds=generate.KINDS, algorithms=SUITE_ALGORITHMS, seed=0, tolerance=0.25):
+    """
+    Generates one maze of every kind and size from `seed` and solves it
+    with every algorithm on the compact backend, recording the states
+    explored, solution length, seconds and traced peak memory of each run
+    to `results_file` as JSON.
+
+    With `baseline_file`, a results file from an earlier run, returns
+    the runs that took more than `tolerance` longer than their baseline,
+    ignoring differences of a few milliseconds, which are timer noise.
+    """
+    results = []
+    print(f"{'kind':<13}{'size':>7} {'algorithm':<15}{'explored':>11}{'length':>9}"
+          f"{'time (s)':>10}{'memory (MB)':>13}")
+    with tempfile.TemporaryDirectory() as directory:
+        for kind in kinds:
+            for size in sizes:
+                filename = os.path.join(directory, f"{kind}{size}.txt")
+                generate.write(generate.generate(kind, size, seed=seed), size, filename)
+                maze = CompactMaze(filename)
+
+                for algorithm in algorithms:
+                    result = {"kind": kind, "size": size, "seed": seed, "algorithm": algorithm}
+                    start = time.perf_counter()
+                    try:
+                        maze.solve(algorithm)
+                        result["seconds"] = time.perf_counter() - start
+                        result["num_explored"] = maze.num_explored
+                        result["solution_length"] = len(maze.solution[0])
+                        if algorithm == "idastar":
+                            result["num_earlier_expansions"] = maze.num_earlier_expansions
+                    except Exception as e:
+                        result["seconds"] = time.perf_counter() - start
+                        result["num_explored"] = getattr(maze, "num_explored", None)
+                        result["solution_length"] = None
+                        result["error"] = str(e)
+
+                    # Measure memory in a second run, since tracing slows it down
+                    tracemalloc.start()
+                    try:
+                        maze.solve(algorithm)
+                    except Exception:
+                        pass
+                    result["peak_memory"] = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+
+                    results.append(result)
+                    length = result["solution_length"]
+                    print(f"{kind:<13}{size:>7} {algorithm:<15}{str(result['num_explored']):>11}"
+                          f"{str(length if length is not None else '-'):>9}"
+                          f"{result['seconds']:>10.3f}{result['peak_memory'] / 2 ** 20:>13.1f}")
+
+    with open(results_file, "w") as f:
+        json.dump({"results": results}, f, indent=2)
+
+    if baseline_file is None:
+        return []
+    with open(baseline_file) as f:
+        baseline = {
+            (run["kind"], run["size"], run["seed"], run["algorithm"]): run
+            for run in json.load(f)["results"]
+        }
+
+    regressions = []
+    for run in results:
+        before = baseline.get((run["kind"], run["size"], run["seed"], run["algorithm"]))
+        if before is None:
+            continue
+        if run["seconds"] > before["seconds"] * (1 + tolerance) + NOISE_SECONDS:
+            regressions.append((run, before))
+    for run, before in regressions:
+        print(f"REGRESSION: {run['algorithm']} on {run['kind']} {run['size']}: "
+              f"{before['seconds']:.3f}s -> {run['seconds']:.3f}s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for the maze search code.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("frontier")
+    solvers = commands.add_parser("solvers")
+    solvers.add_argument("mazes", nargs="+")
+    backend = commands.add_parser("backend")
+    backend.add_argument("sizes", nargs="*", type=int, default=[200, 1000, 2000])
+    suite = commands.add_parser("suite")
+    suite.add_argument("results")
+    suite.add_argument("--baseline")
+    suite.add_argument("--sizes", default="100,300,1000")
+    suite.add_argument("--kinds", default=",".join(generate.KINDS))
+    suite.add_argument("--algorithms", default=",".join(SUITE_ALGORITHMS))
+    suite.add_argument("--seed", type=int, default=0)
+    suite.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    if args.command == "frontier":
+        benchmark_frontier()
+    elif args.command == "solvers":
+        benchmark_solvers(args.mazes)
+    elif args.command == "backend":
+        benchmark_backend(args.sizes)
+    elif args.command == "suite":
+        regressions = benchmark_suite(
+            args.results,
+            args.baseline,
+            sizes=[int(size) for size in args.sizes.split(",")],
+            kinds=args.kinds.split(","),
+            algorithms=args.algorithms.split(","),
+            seed=args.seed,
+            tolerance=args.tolerance
+        )
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Seeded procedural maze generator.
+
+Usage: python generate.py kind size [seed] maze.txt
+
+where kind is one of "backtracker", "rooms" or "noise".
+"""
+
+import random
+import sys
+
+KINDS = ("backtracker", "rooms", "noise")
+
+
+def generate(kind, height, width=None, seed=0, room=16, density=0.25):
+    """
+    Returns a `height` x `width` maze as one flat bytearray of characters,
+    row by row, with the start in the top-left corner and the goal in the
+    bottom-right. The same `kind`, size and `seed` always give the same maze.
+
+    - "backtracker": a perfect maze carved by a randomized depth-first
+      search, with exactly one path between any two cells.
+    - "rooms": open `room` x `room` rooms separated by walls, with one
+      door in the wall between any two neighboring rooms.
+    - "noise": an open grid with each cell a wall with probability `density`.
+      Such mazes are not always solvable.
+    """
+    width = height if width is None else width
+    rng = random.Random(seed)
+    if kind == "backtracker":
+        grid = _backtracker(height, width, rng)
+    elif kind == "rooms":
+        grid = _rooms(height, width, rng, room)
+    elif kind == "noise":
+        grid = _noise(height, width, rng, density)
+    else:
+        raise ValueError(f"unknown maze kind: {kind}")
+
+    start = 0
+    goal = height * width - 1
+    if kind == "backtracker":
+        # Carved cells sit on odd coordinates, so use the outermost ones
+        start = width + 1
+        goal = (height - 2 - (height % 2 == 0)) * width + width - 2 - (width % 2 == 0)
+    if start == goal:
+        raise ValueError("mazes must have room for both a start and a goal")
+    grid[start] = ord("A")
+    grid[goal] = ord("B")
+    return grid
+
+
+def write(grid, width, filename):
+    """
+    Writes a maze returned by `generate` to a text file.
+    """
+    with open(filename, "wb") as f:
+        for offset in range(0, len(grid), width):
+            f.write(grid[offset:offset + width])
+            f.write(b"\n")
+
+
+def _backtracker(height, width, rng):
+    # Smaller mazes have only one cell, which the start and goal would share
+    if height < 5 or width < 5:
+        raise ValueError("backtracker mazes must be at least 5 x 5")
+    grid = bytearray(b"#") * (height * width)
+
+    # Cells live on odd coordinates; the cells in between are walls
+    # that get knocked down as the search carves through them
+    rows = (height - 1) // 2
+    cols = (width - 1) // 2
+    visited = bytearray(rows * cols)
+
+    visited[0] = 1
+    grid[width + 1] = ord(" ")
+    stack = [0]
+    while stack:
+        cell = stack[-1]
+        row, col = divmod(cell, cols)
+        choices = []
+        if row > 0 and not visited[cell - cols]:
+            choices.append(cell - cols)
+        if row < rows - 1 and not visited[cell + cols]:
+            choices.append(cell + cols)
+        if col > 0 and not visited[cell - 1]:
+            choices.append(cell - 1)
+        if col < cols - 1 and not visited[cell + 1]:
+            choices.append(cell + 1)
+        if not choices:
+            stack.pop()
+            continue
+
+        following = rng.choice(choices)
+        visited[following] = 1
+        next_row, next_col = divmod(following, cols)
+        grid[(row + next_row + 1) * width + col + next_col + 1] = ord(" ")
+        grid[(2 * next_row + 1) * width + 2 * next_col + 1] = ord(" ")
+        stack.append(following)
+    return grid
+
+
+def _rooms(height, width, rng, room):
+    # Walls run only between rooms, never along the far edges, so the
+    # goal in the bottom-right corner is always inside the last room
+    row = bytearray(b" " * width)
+    for col in range(room - 1, width - 1, room):
+        row[col] = ord("#")
+    grid = bytearray()
+    for i in range(height):
+        if i % room == room - 1 and i < height - 1:
+            grid += b"#" * width
+        else:
+            grid += row
+
+    # One door in each wall between two neighboring rooms
+    for top in range(0, height, room):
+        for left in range(0, width, room):
+            bottom = min(top + room - 1, height)
+            right = min(left + room - 1, width)
+            if bottom < height - 1:
+                grid[bottom * width + rng.randrange(left, right)] = ord(" ")
+            if right < width - 1:
+                grid[rng.randrange(top, bottom) * width + right] = ord(" ")
+    return grid
+
+
+def _noise(height, width, rng, density):
+    return bytearray(
+        ord("#") if rng.random() < density else ord(" ")
+        for _ in range(height * width)
+    )
+
+
+def main():
+    if len(sys.argv) not in (4, 5) or sys.argv[1] not in KINDS:
+        sys.exit(__doc__.strip())
+    kind = sys.argv[1]
+    size = int(sys.argv[2])
+    seed = int(sys.argv[3]) if len(sys.argv) == 5 else 0
+    write(generate(kind, size, seed=seed), size, sys.argv[-1])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,390 @@
+"""
+Hierarchical pathfinding (HPA*) for very large mazes.
+
+Usage: python hpa.py maze.txt [cluster_size] [--compact] [--cache=directory]
+"""
+
+import hashlib
+import heapq
+import itertools
+import math
+import multiprocessing
+import os
+import pickle
+import sys
+import time
+from collections import deque
+
+from maze import CompactMaze, DIRECTIONS, Maze, manhattan
+
+# Runs of open cells along a cluster border at least this long get an
+# entrance at each end rather than one in the middle
+LONG_ENTRANCE = 6
+
+# Action for each change in (row, col)
+ACTIONS = {delta: action for action, delta in DIRECTIONS.items()}
+
+# Stand-ins for the start and goal in the abstract graph, so that they
+# never clash with an entrance on the same cell
+START = "start"
+GOAL = "goal"
+
+
+class Abstraction():
+    """
+    Abstract graph over a `Maze` split into square clusters.
+
+    The nodes are entrance cells on either side of each opening between
+    two neighboring clusters. Entrances facing each other are joined by a
+    single step, and entrances of the same cluster by the cost of the
+    cheapest path between them that stays inside the cluster. Building
+    that graph is done once, a cluster per task across a process pool,
+    after which every query searches the small abstract graph and only
+    then fills in paths inside the clusters it passes through.
+
+    Paths found this way are close to the cheapest, but not always
+    the cheapest, since they must go through entrance cells.
+    """
+
+    def __init__(self, maze, cluster_size=32, processes=None, cache_dir=None):
+        self.maze = maze
+        self.cluster_size = cluster_size
+
+        filename = None
+        if cache_dir is not None:
+            filename = os.path.join(cache_dir, f"{self._digest()}-{cluster_size}.hpa")
+
+        if filename is not None and os.path.exists(filename):
+            with open(filename, "rb") as f:
+                self.entrances, self.edges = pickle.load(f)
+        else:
+            self._build(processes)
+            if filename is not None:
+                os.makedirs(cache_dir, exist_ok=True)
+                with open(filename, "wb") as f:
+                    pickle.dump((self.entrances, self.edges), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+    def find_path(self, start=None, goal=None):
+        """
+        Returns the (actions, cells) of a path from `start` to `goal`,
+        the maze's own start and goal by default. Sets `solution_cost`,
+        `num_abstract` (abstract nodes expanded) and `num_explored`
+        (those plus every cell expanded by the local searches).
+        """
+        start = self.maze.start if start is None else tuple(start)
+        goal = self.maze.goal if goal is None else tuple(goal)
+        self.num_abstract = 0
+        self.num_explored = 0
+
+        # Link the start and goal to the entrances of their clusters
+        start_edges = self._link(start, reverse=False)
+        goal_edges = self._link(goal, reverse=True)
+        if self._cluster(start) == self._cluster(goal):
+            direct = self._local_search(start, reverse=False)[0]
+            if goal in direct:
+                start_edges[GOAL] = direct[goal]
+
+        # A* over the abstract graph
+        cells = {START: start, GOAL: goal}
+        costs = {START: 0}
+        parents = {START: None}
+        counter = itertools.count()
+        frontier = [(manhattan(start, goal), next(counter), START)]
+        done = set()
+        while frontier:
+            _, _, node = heapq.heappop(frontier)
+            if node in done:
+                continue
+            done.add(node)
+            self.num_abstract += 1
+            if node == GOAL:
+                break
+
+            if node == START:
+                successors = start_edges.items()
+            else:
+                successors = list(self.edges.get(node, {}).items())
+                if node in goal_edges:
+                    successors.append((GOAL, goal_edges[node]))
+
+            for neighbor, step in successors:
+                cost = costs[node] + step
+                if cost < costs.get(neighbor, math.inf):
+                    costs[neighbor] = cost
+                    parents[neighbor] = node
+                    cell = cells.get(neighbor, neighbor)
+                    heapq.heappush(frontier, (cost + manhattan(cell, goal), next(counter), neighbor))
+        else:
+            self.num_explored += self.num_abstract
+            raise Exception("no solution")
+        self.num_explored += self.num_abstract
+        self.solution_cost = costs[GOAL]
+
+        # Refine the abstract path into cells
+        route = []
+        node = GOAL
+        while node is not None:
+            route.append(cells.get(node, node))
+            node = parents[node]
+        route.reverse()
+
+        actions = []
+        path = []
+        for a, b in zip(route, route[1:]):
+            if a == b:
+                continue
+            if self._cluster(a) == self._cluster(b):
+                for cell in self._local_path(a, b):
+                    actions.append(ACTIONS[(cell[0] - a[0], cell[1] - a[1])])
+                    path.append(cell)
+                    a = cell
+            else:
+                actions.append(ACTIONS[(b[0] - a[0], b[1] - a[1])])
+                path.append(b)
+        return (actions, path)
+
+
+    def _build(self, processes):
+        """
+        Finds the entrances and the edges between them, running one
+        search task per cluster in a pool of `processes` workers.
+        """
+        size = self.cluster_size
+        self.entrances = {}
+        self.edges = {}
+
+        # Entrances along each border between two neighboring clusters
+        for top in range(0, self.maze.height, size):
+            for left in range(0, self.maze.width, size):
+                bottom = top + size - 1
+                right = left + size - 1
+                if bottom + 1 < self.maze.height:
+                    columns = range(left, min(right + 1, self.maze.width))
+                    self._add_entrances([((bottom, j), (bottom + 1, j)) for j in columns])
+                if right + 1 < self.maze.width:
+                    rows = range(top, min(bottom + 1, self.maze.height))
+                    self._add_entrances([((i, right), (i, right + 1)) for i in rows])
+
+        # Paths between the entrances of each cluster
+        clusters = []
+        tasks = []
+        for cluster, cells in self.entrances.items():
+            if len(cells) > 1:
+                top, left, height, width = self._bounds(cluster)
+                walls, costs = self.maze.region(top, left, height, width)
+                local = [(row - top) * width + col - left for row, col in cells]
+                clusters.append(cells)
+                tasks.append((walls, costs, height, width, local))
+
+        if processes == 1 or len(tasks) < 2:
+            results = list(map(_cluster_edges, tasks))
+        else:
+            with multiprocessing.Pool(processes) as pool:
+                results = pool.map(_cluster_edges, tasks, chunksize=max(1, len(tasks) // 64))
+
+        for cells, pairs in zip(clusters, results):
+            for i, j, cost in pairs:
+                self.edges.setdefault(cells[i], {})[cells[j]] = cost
+
+
+    def _add_entrances(self, pairs):
+        """
+        Adds entrances for the runs of facing open cells in `pairs`,
+        a list of cell pairs across one cluster border.
+        """
+        runs = [[]]
+        for a, b in pairs:
+            if self.maze.is_open(*a) and self.maze.is_open(*b):
+                runs[-1].append((a, b))
+            elif runs[-1]:
+                runs.append([])
+
+        for run in runs:
+            if not run:
+                continue
+            if len(run) < LONG_ENTRANCE:
+                chosen = [run[len(run) // 2]]
+            else:
+                chosen = [run[0], run[-1]]
+            for a, b in chosen:
+                for cell in (a, b):
+                    cells = self.entrances.setdefault(self._cluster(cell), [])
+                    if cell not in cells:
+                        cells.append(cell)
+                self.edges.setdefault(a, {})[b] = self.maze.cost(self.maze._state(b))
+                self.edges.setdefault(b, {})[a] = self.maze.cost(self.maze._state(a))
+
+
+    def _link(self, cell, reverse):
+        """
+        Returns the costs between `cell` and each entrance of its cluster
+        it can reach: from `cell` to the entrance, or the other way round
+        if `reverse`.
+        """
+        distances = self._local_search(cell, reverse)[0]
+        return {
+            other: distances[other]
+            for other in self.entrances.get(self._cluster(cell), [])
+            if other in distances
+        }
+
+
+    def _local_path(self, a, b):
+        """Returns the cells after `a` on a cheapest path to `b` inside their cluster."""
+        parents = self._local_search(a, reverse=False)[1]
+        cells = []
+        while b != a:
+            cells.append(b)
+            b = parents[b]
+        cells.reverse()
+        return cells
+
+
+    def _local_search(self, cell, reverse):
+        """
+        Runs `_search` inside the cluster of `cell`, returning distances
+        and parents keyed by maze cells.
+        """
+        top, left, height, width = self._bounds(self._cluster(cell))
+        walls, costs = self.maze.region(top, left, height, width)
+        source = (cell[0] - top) * width + cell[1] - left
+        distances, parents, explored = _search(walls, costs, height, width, source, reverse)
+        self.num_explored += explored
+
+        def to_cell(index):
+            row, col = divmod(index, width)
+            return (row + top, col + left)
+
+        return (
+            {to_cell(index): cost for index, cost in enumerate(distances) if cost != math.inf},
+            {to_cell(index): to_cell(parent) for index, parent in enumerate(parents) if parent is not None}
+        )
+
+
+    def _cluster(self, cell):
+        return (cell[0] // self.cluster_size, cell[1] // self.cluster_size)
+
+
+    def _bounds(self, cluster):
+        """Returns the top, left, height and width of a cluster."""
+        top = cluster[0] * self.cluster_size
+        left = cluster[1] * self.cluster_size
+        height = min(self.cluster_size, self.maze.height - top)
+        width = min(self.cluster_size, self.maze.width - left)
+        return top, left, height, width
+
+
+    def _digest(self):
+        """Returns a hash of the maze's size, walls and costs."""
+        digest = hashlib.sha256(f"{self.maze.height}x{self.maze.width}".encode())
+        for top in range(0, self.maze.height, self.cluster_size):
+            height = min(self.cluster_size, self.maze.height - top)
+            walls, costs = self.maze.region(top, 0, height, self.maze.width)
+            digest.update(walls)
+            digest.update(costs or b"")
+        return digest.hexdigest()
+
+
+def _search(walls, costs, height, width, source, reverse=False):
+    """
+    Dijkstra's algorithm over one rectangle of cells given as `walls` and
+    `costs` bytes, from the local index `source`, or breadth-first search
+    when there are no costs. Stepping onto a cell costs its cost, or, if
+    `reverse`, stepping off it does, which gives the costs of paths
+    leading to `source` instead.
+    Returns lists of the distance (math.inf if unreached) and parent of
+    every local index, and how many cells were expanded.
+    """
+    size = height * width
+    distances = [math.inf] * size
+    parents = [None] * size
+    distances[source] = 0
+    explored = 0
+
+    def neighbors(index):
+        col = index % width
+        return (
+            index - width,
+            index + width,
+            index - 1 if col > 0 else -1,
+            index + 1 if col < width - 1 else -1
+        )
+
+    if costs is None:
+        frontier = deque([source])
+        while frontier:
+            index = frontier.popleft()
+            explored += 1
+            cost = distances[index] + 1
+            for neighbor in neighbors(index):
+                if 0 <= neighbor < size and not walls[neighbor] and distances[neighbor] == math.inf:
+                    distances[neighbor] = cost
+                    parents[neighbor] = index
+                    frontier.append(neighbor)
+        return distances, parents, explored
+
+    frontier = [(0, source)]
+    while frontier:
+        cost, index = heapq.heappop(frontier)
+        if cost > distances[index]:
+            continue
+        explored += 1
+        for neighbor in neighbors(index):
+            if not 0 <= neighbor < size or walls[neighbor]:
+                continue
+            step = cost + (costs[index] if reverse else costs[neighbor])
+            if step < distances[neighbor]:
+                distances[neighbor] = step
+                parents[neighbor] = index
+                heapq.heappush(frontier, (step, neighbor))
+    return distances, parents, explored
+
+
+def _cluster_edges(task):
+    """
+    Returns (i, j, cost) for every pair of entrances of one cluster,
+    given by local index, that are joined by a path inside the cluster.
+    """
+    walls, costs, height, width, entrances = task
+    pairs = []
+    for i, source in enumerate(entrances):
+        distances = _search(walls, costs, height, width, source)[0]
+        for j, target in enumerate(entrances):
+            if i != j and distances[target] != math.inf:
+                pairs.append((i, j, distances[target]))
+    return pairs
+
+
+def main():
+    options = [arg for arg in sys.argv[1:] if arg.startswith("--")]
+    args = [arg for arg in sys.argv[1:] if arg not in options]
+    if len(args) not in (1, 2):
+        sys.exit(__doc__.strip().splitlines()[-1])
+    cache_dir = None
+    for option in options:
+        if option.startswith("--cache="):
+            cache_dir = option[len("--cache="):]
+
+    maze = CompactMaze(args[0]) if "--compact" in options else Maze(args[0])
+    cluster_size = int(args[1]) if len(args) == 2 else 32
+
+    start = time.perf_counter()
+    abstraction = Abstraction(maze, cluster_size, cache_dir=cache_dir)
+    print(f"Abstraction: {len(abstraction.edges)} entrances "
+          f"in {time.perf_counter() - start:.3f}s")
+
+    start = time.perf_counter()
+    actions, cells = abstraction.find_path()
+    print(f"HPA*: length {len(actions)}, cost {abstraction.solution_cost}, "
+          f"{abstraction.num_abstract} abstract nodes, {abstraction.num_explored} explored "
+          f"in {time.perf_counter() - start:.3f}s")
+
+    start = time.perf_counter()
+    maze.solve("astar")
+    print(f"A*:   length {len(maze.solution[0])}, cost {maze.solution_cost}, "
+          f"{maze.num_explored} explored in {time.perf_counter() - start:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
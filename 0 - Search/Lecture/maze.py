@@ -1,21 +1,43 @@
+import glob
+import hashlib
+import heapq
+import itertools
+import json
+import math
+import mmap
+import multiprocessing
+import os
+import struct
 import sys
+import time
+import tracemalloc
+from collections import deque
 
 class Node():
-    def __init__(self, state, parent, action):
+    def __init__(self, state, parent, action, cost=0):
         self.state = state
         self.parent = parent
         self.action = action
+        self.cost = cost
 
 
 class StackFrontier():
     def __init__(self):
-        self.frontier = []
+        self.frontier = deque()
+
+        # Maps each state in the frontier to how many nodes hold it,
+        # so membership checks never have to scan the frontier
+        self.states = {}
+
+    def __len__(self):
+        return len(self.frontier)
 
     def add(self, node):
         self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
 
     def contains_state(self, state):
-        return any(node.state == state for node in self.frontier)
+        return state in self.states
 
     def empty(self):
         return len(self.frontier) == 0
@@ -24,10 +46,17 @@ class StackFrontier():
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.frontier[-1]
-            self.frontier = self.frontier[:-1]
+            node = self.frontier.pop()
+            self._forget(node.state)
             return node
 
+    def _forget(self, state):
+        count = self.states[state]
+        if count == 1:
+            del self.states[state]
+        else:
+            self.states[state] = count - 1
+
 
 class QueueFrontier(StackFrontier):
 
@@ -35,13 +64,149 @@ class QueueFrontier(StackFrontier):
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.frontier[0]
-            self.frontier = self.frontier[1:]
+            node = self.frontier.popleft()
+            self._forget(node.state)
             return node
 
+
+class PriorityFrontier():
+    """
+    Frontier that always removes the node with the lowest priority.
+    Ties are broken in insertion order.
+
+    Adding a state that is already in the frontier with a lower priority
+    replaces the old entry, which is then skipped lazily on removal.
+    """
+
+    def __init__(self):
+        self.frontier = []
+        self.entries = {}
+        self.counter = itertools.count()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, node, priority=0):
+        entry = self.entries.get(node.state)
+        if entry is not None:
+            if entry[0] <= priority:
+                return
+            entry[2] = None
+        entry = [priority, next(self.counter), node]
+        self.entries[node.state] = entry
+        heapq.heappush(self.frontier, entry)
+
+    def contains_state(self, state):
+        return state in self.entries
+
+    def priority(self, state):
+        """
+        Returns the priority `state` is queued with, or None.
+        """
+        entry = self.entries.get(state)
+        return entry[0] if entry is not None else None
+
+    def empty(self):
+        return len(self.entries) == 0
+
+    def remove(self):
+        while self.frontier:
+            priority, _, node = heapq.heappop(self.frontier)
+            if node is not None:
+                del self.entries[node.state]
+                return node
+        raise Exception("empty frontier")
+
+
+# Turns a row of walls into printable text
+TEXT_CELLS = bytes.maketrans(b"\x00\x01", b" #")
+
+# Image colors, indexed by the values of the array Maze.output_image builds
+PALETTE = (
+    (40, 40, 40),
+    (237, 240, 252),
+    (212, 97, 85),
+    (220, 235, 113),
+    (255, 0, 0),
+    (0, 171, 28),
+    (0, 0, 0)
+)
+(WALL_COLOR, EMPTY_COLOR, EXPLORED_COLOR, SOLUTION_COLOR,
+ START_COLOR, GOAL_COLOR, BORDER_COLOR) = range(7)
+
+# Every algorithm Maze.solve accepts
+ALGORITHMS = ("dfs", "bfs", "bidirectional", "greedy", "astar", "idastar", "jps", "dijkstra")
+
+# Change in (row, col) for each move
+DIRECTIONS = {"up": (-1, 0), "down": (1, 0), "left": (0, -1), "right": (0, 1)}
+
+# Action that undoes each move
+OPPOSITE = {"up": "down", "down": "up", "left": "right", "right": "left"}
+
+
+# Maps every byte of a maze file to 1 for a wall or 0 for an open cell
+WALL_BYTES = bytes(0 if byte in b" AB" else 1 for byte in range(256))
+
+# Packed binary maze files start with this, followed by the header fields
+# height, width, start row, start column, goal row and goal column
+BINARY_MAGIC = b"MAZEBITS"
+BINARY_HEADER = "<6I"
+
+# Convert walls to and from the digits of a binary number
+TO_BITS = bytes.maketrans(b"\x00\x01", b"01")
+FROM_BITS = bytes.maketrans(b"01", b"\x00\x01")
+
+
+def manhattan(state, goal):
+    """
+    Returns the Manhattan distance between two cells.
+    """
+    return abs(state[0] - goal[0]) + abs(state[1] - goal[1])
+
+
+def _maze_rows(contents):
+    """
+    Yields the rows of a maze file's raw `contents` one at a time,
+    as bytes with one byte per character.
+    """
+    position = 0
+    size = len(contents)
+    while position < size:
+        end = contents.find(b"\n", position)
+        if end == -1:
+            end = size
+        row = contents[position:end]
+        position = end + 1
+        if row.endswith(b"\r"):
+            row = row[:-1]
+        if not row.isascii():
+            row = row.decode("utf-8", "replace").encode("latin-1", "replace")
+        yield row
+
+
+def _check_legend(legend):
+    """
+    Validates a legend of terrain costs, returning it as a dictionary.
+    """
+    legend = dict(legend or {})
+    for char, cost in legend.items():
+        if len(char) != 1 or char in " AB" or ord(char) > 255:
+            raise ValueError(f"invalid terrain character: {char!r}")
+        if not isinstance(cost, int) or not 1 <= cost <= 255:
+            raise ValueError(f"terrain cost must be an integer from 1 to 255: {char!r}")
+    return legend
+
+
 class Maze():
 
-    def __init__(self, filename):
+    def __init__(self, filename, legend=None):
+        """
+        Loads a maze from a text file. Spaces are open cells and every
+        other character is a wall, except those in `legend`, a dictionary
+        mapping characters to the cost of stepping onto them. Open cells,
+        the start and the goal cost 1.
+        """
+        legend = _check_legend(legend)
 
         # Read file and set height and width of maze
         with open(filename) as f:
@@ -58,13 +223,16 @@ class Maze():
         self.height = len(contents)
         self.width = max(len(line) for line in contents)
 
-        # Keep track of walls
+        # Keep track of walls, and of costs if the maze is weighted
         self.walls = []
+        self.costs = [] if legend else None
         for i in range(self.height):
             row = []
             for j in range(self.width):
                 try:
-                    if contents[i][j] == "A":
+                    if contents[i][j] in legend:
+                        row.append(False)
+                    elif contents[i][j] == "A":
                         self.start = (i, j)
                         row.append(False)
                     elif contents[i][j] == "B":
@@ -77,27 +245,46 @@ class Maze():
                 except IndexError:
                     row.append(False)
             self.walls.append(row)
+            if legend:
+                self.costs.append([legend.get(char, 1) for char in contents[i]])
+                self.costs[i].extend([1] * (self.width - len(contents[i])))
 
         self.solution = None
 
 
     def print(self):
-        solution = self.solution[1] if self.solution is not None else None
-        print()
-        for i, row in enumerate(self.walls):
-            for j, col in enumerate(row):
-                if col:
-                    print("█", end="")
-                elif (i, j) == self.start:
-                    print("A", end="")
-                elif (i, j) == self.goal:
-                    print("B", end="")
-                elif solution is not None and (i, j) in solution:
-                    print("*", end="")
-                else:
-                    print(" ", end="")
-            print()
-        print()
+        """
+        Prints the maze, marking the solution if there is one. Each row is
+        built as a single string from its walls, and only the cells on the
+        solution are patched in afterwards.
+        """
+        marks = {}
+        if self.solution is not None:
+            for row, col in self.solution[1]:
+                marks.setdefault(row, {})[col] = "*"
+        marks.setdefault(self.start[0], {})[self.start[1]] = "A"
+        marks.setdefault(self.goal[0], {})[self.goal[1]] = "B"
+
+        lines = []
+        for i in range(self.height):
+            line = self._wall_row(i).translate(TEXT_CELLS).decode().replace("#", "█")
+            row_marks = marks.get(i)
+            if row_marks:
+                pieces = []
+                previous = 0
+                for col in sorted(row_marks):
+                    pieces.append(line[previous:col])
+                    pieces.append(row_marks[col])
+                    previous = col + 1
+                pieces.append(line[previous:])
+                line = "".join(pieces)
+            lines.append(line)
+        print("\n" + "\n".join(lines) + "\n")
+
+
+    def _wall_row(self, i):
+        """Returns row `i` of the walls as bytes, 1 for a wall and 0 otherwise."""
+        return bytes(self.walls[i])
 
 
     def neighbors(self, state):
@@ -116,19 +303,115 @@ class Maze():
         return result
 
 
-    def solve(self):
-        """Finds a solution to maze, if one exists."""
+    def is_wall(self, cell):
+        """Returns whether the (row, col) `cell` is a wall."""
+        return self.walls[cell[0]][cell[1]]
+
+
+    def is_open(self, row, col):
+        """Returns whether (row, col) is inside the maze and not a wall."""
+        return 0 <= row < self.height and 0 <= col < self.width and not self.walls[row][col]
+
+
+    def set_wall(self, cell, wall):
+        """
+        Makes the (row, col) `cell` a wall or an open cell, forgetting
+        any solution found before the change.
+        """
+        self.walls[cell[0]][cell[1]] = bool(wall)
+        self.solution = None
+
+
+    def region(self, top, left, height, width):
+        """
+        Returns the walls of a rectangle of the maze as bytes, row by row,
+        1 for a wall and 0 otherwise, along with the cell costs in the same
+        layout, or None if the maze is not weighted.
+        """
+        rows = range(top, top + height)
+        walls = b"".join(bytes(self.walls[i][left:left + width]) for i in rows)
+        if self.costs is None:
+            return walls, None
+        return walls, b"".join(bytes(self.costs[i][left:left + width]) for i in rows)
+
+
+    def cost(self, state):
+        """Returns the cost of stepping onto the cell of `state`."""
+        return self.costs[state[0]][state[1]] if self.costs is not None else 1
+
+
+    def max_cost(self):
+        """Returns the highest cost of any cell."""
+        return max(map(max, self.costs)) if self.costs is not None else 1
+
+
+    def _state(self, cell):
+        """
+        Returns the search state for a (row, col) cell.
+        Solvers work on states, which for this backend are the cells themselves.
+        """
+        return cell
+
+
+    def _cell(self, state):
+        """Returns the (row, col) cell for a search state."""
+        return state
+
+
+    def _heuristic(self, heuristic, goal):
+        """
+        Returns a function of one state estimating its distance to `goal`,
+        from a user heuristic on cells or, by default, Manhattan distance.
+        """
+        if heuristic is None:
+            return lambda state: manhattan(state, goal)
+        return lambda state: heuristic(state, goal)
+
+
+    def solve(self, algorithm="dfs", heuristic=None):
+        """
+        Finds a solution to maze, if one exists.
+
+        `algorithm` is one of "dfs", "bfs", "bidirectional", "greedy",
+        "astar", "idastar", "jps" or "dijkstra". Only "astar", "idastar"
+        and "dijkstra" find the cheapest path through weighted terrain;
+        the others count steps.
+        Sets `solution_cost` to the total cost of the solution found.
+        The informed searches rank states with `heuristic(state, goal)`,
+        which defaults to the Manhattan distance between the two cells.
+        """
+        if algorithm == "dfs":
+            self._solve_uninformed(StackFrontier())
+        elif algorithm == "bfs":
+            self._solve_uninformed(QueueFrontier())
+        elif algorithm == "bidirectional":
+            self._solve_bidirectional()
+        elif algorithm == "greedy":
+            self._solve_greedy(heuristic)
+        elif algorithm == "astar":
+            self._solve_astar(heuristic)
+        elif algorithm == "idastar":
+            self._solve_idastar(heuristic)
+        elif algorithm == "jps":
+            self._solve_jps()
+        elif algorithm == "dijkstra":
+            self._solve_dijkstra()
+        else:
+            raise ValueError(f"unknown algorithm: {algorithm}")
+
+        self.solution_cost = sum(self.cost(self._state(cell)) for cell in self.solution[1])
+
+
+    def _solve_uninformed(self, frontier):
+        """Depth-first or breadth-first search, depending on `frontier`."""
 
         # Keep track of number of states explored
         self.num_explored = 0
 
         # Initialize frontier to just the starting position
-        start = Node(state=self.start, parent=None, action=None)
-        # depth first search 
-        frontier = StackFrontier()
-        # breadth first search 
-        #frontier = QueueFrontier() 
+        start = Node(state=self._state(self.start), parent=None, action=None)
         frontier.add(start)
+        goal = self._state(self.goal)
 
         # Initialize an empty explored set
         self.explored = set()
@@ -145,16 +428,8 @@ class Maze():
             self.num_explored += 1
 
             # If node is the goal, then we have a solution
-            if node.state == self.goal:
-                actions = []
-                cells = []
-                while node.parent is not None:
-                    actions.append(node.action)
-                    cells.append(node.state)
-                    node = node.parent
-                actions.reverse()
-                cells.reverse()
-                self.solution = (actions, cells)
+            if node.state == goal:
+                self.solution = self._backtrack(node)
                 return
 
             # Mark node as explored
@@ -167,66 +442,899 @@ class Maze():
                     frontier.add(child)
 
 
-    # def output_image(self, filename, show_solution=True, show_explored=False):
-    #     from PIL import Image, ImageDraw
-    #     cell_size = 50
-    #     cell_border = 2
+    def _solve_bidirectional(self):
+        """
+        Breadth-first search from the start and the goal at once,
+        one whole layer at a time, always growing the smaller side.
+        Stops after the layer in which the two searches first meet.
+
+        Besides `num_explored`, records `num_explored_forward` and
+        `num_explored_backward` for the two halves of the search.
+        """
+        self.num_explored_forward = 0
+        self.num_explored_backward = 0
+        self.explored = set()
+
+        # Each side maps reached states to (neighbor, action), the neighbor
+        # being one step closer to where that side started
+        start = self._state(self.start)
+        goal = self._state(self.goal)
+        forward = {start: None}
+        backward = {goal: None}
+        forward_layer = [start]
+        backward_layer = [goal]
+
+        meeting = start if start == goal else None
+        while meeting is None:
+            if not forward_layer or not backward_layer:
+                self.num_explored = self.num_explored_forward + self.num_explored_backward
+                raise Exception("no solution")
+
+            # Grow whichever side has the smaller layer
+            grow_forward = len(forward_layer) <= len(backward_layer)
+            if grow_forward:
+                layer, reached, other = forward_layer, forward, backward
+            else:
+                layer, reached, other = backward_layer, backward, forward
+
+            # Expand the whole layer, keeping the meeting point with the
+            # shortest combined path, since the other side's depths differ
+            next_layer = []
+            best = None
+            for state in layer:
+                self.explored.add(state)
+                for action, neighbor in self.neighbors(state):
+                    if neighbor in reached:
+                        continue
+                    reached[neighbor] = (state, action)
+                    next_layer.append(neighbor)
+                    if neighbor in other:
+                        length = self._half_length(other, neighbor)
+                        if best is None or length < best[0]:
+                            best = (length, neighbor)
+
+            if grow_forward:
+                self.num_explored_forward += len(layer)
+                forward_layer = next_layer
+            else:
+                self.num_explored_backward += len(layer)
+                backward_layer = next_layer
+            if best is not None:
+                meeting = best[1]
+
+        self.num_explored = self.num_explored_forward + self.num_explored_backward
+
+        # Walk back from the meeting point to the start...
+        actions = []
+        cells = []
+        state = meeting
+        while forward[state] is not None:
+            previous, action = forward[state]
+            actions.append(action)
+            cells.append(self._cell(state))
+            state = previous
+        actions.reverse()
+        cells.reverse()
+
+        # ...then forward from it to the goal, reversing each action
+        state = meeting
+        while backward[state] is not None:
+            following, action = backward[state]
+            actions.append(OPPOSITE[action])
+            cells.append(self._cell(following))
+            state = following
+
+        self.solution = (actions, cells)
+
+
+    def _half_length(self, reached, state):
+        """Returns how many steps `state` is from the root of `reached`."""
+        length = 0
+        while reached[state] is not None:
+            state = reached[state][0]
+            length += 1
+        return length
+
+
+    def _solve_greedy(self, heuristic):
+        """Greedy best-first search, always expanding the state closest to the goal."""
+        self.num_explored = 0
+        start = self._state(self.start)
+        goal = self._state(self.goal)
+        estimate = self._heuristic(heuristic, goal)
+        frontier = PriorityFrontier()
+        frontier.add(Node(state=start, parent=None, action=None))
+        self.explored = set()
+
+        while True:
+            if frontier.empty():
+                raise Exception("no solution")
+
+            node = frontier.remove()
+            self.num_explored += 1
+
+            if node.state == goal:
+                self.solution = self._backtrack(node)
+                return
+
+            self.explored.add(node.state)
+
+            for action, state in self.neighbors(node.state):
+                if not frontier.contains_state(state) and state not in self.explored:
+                    child = Node(state=state, parent=node, action=action)
+                    frontier.add(child, estimate(state))
+
+
+    def _solve_astar(self, heuristic):
+        """
+        A* search, expanding states by path cost plus heuristic,
+        taking terrain costs into account.
+        States are reopened when a cheaper path to them turns up,
+        so the solution is optimal for any admissible heuristic.
+        """
+        self.num_explored = 0
+        start = self._state(self.start)
+        goal = self._state(self.goal)
+        estimate = self._heuristic(heuristic, goal)
+        frontier = PriorityFrontier()
+        frontier.add(Node(state=start, parent=None, action=None))
+        self.explored = set()
+
+        # Cheapest known cost from the start to each reached state
+        costs = {start: 0}
+
+        while True:
+            if frontier.empty():
+                raise Exception("no solution")
+
+            node = frontier.remove()
+            self.num_explored += 1
+
+            if node.state == goal:
+                self.solution = self._backtrack(node)
+                return
+
+            self.explored.add(node.state)
+
+            for action, state in self.neighbors(node.state):
+                cost = node.cost + self.cost(state)
+                if cost < costs.get(state, cost + 1):
+                    costs[state] = cost
+                    child = Node(state=state, parent=node, action=action, cost=cost)
+                    frontier.add(child, cost + estimate(state))
+
+
+    def _solve_idastar(self, heuristic):
+        """
+        Iterative deepening A*: repeated depth-first searches that give up
+        on any path whose cost plus heuristic exceeds a bound, raising the
+        bound to the smallest value that went over it each time round.
 
-    #     # Create a blank canvas
-    #     img = Image.new(
-    #         "RGBA",
-    #         (self.width * cell_size, self.height * cell_size),
-    #         "black"
-    #     )
-    #     draw = ImageDraw.Draw(img)
+        Only the current path is kept, on an explicit stack rather than
+        Python's call stack, so memory grows with the path's length rather
+        than the maze's area and `explored` stays empty. The price is
+        expanding states again, both in every iteration and within one
+        when different paths reach them, which on open areas is a great
+        many times: it suits long corridors far better than rooms.
 
-        solution = self.solution[1] if self.solution is not None else None
-        for i, row in enumerate(self.walls):
-            for j, col in enumerate(row):
+        Sets `num_iterations`, `max_depth` (the longest the stack got) and
+        `num_earlier_expansions` (how many of `num_explored` came in the
+        iterations before the final one, first expansions of states
+        included, so it is not a count of repeats).
+        """
+        self.num_explored = 0
+        self.num_iterations = 0
+        self.max_depth = 0
+        self.explored = set()
+        start = self._state(self.start)
+        goal = self._state(self.goal)
+        estimate = self._heuristic(heuristic, goal)
+
+        bound = estimate(start)
+        while True:
+            self.num_iterations += 1
+            explored_before = self.num_explored
+            next_bound = math.inf
 
-                # Walls
-                if col:
-                    fill = (40, 40, 40)
+            # Each frame holds a state on the path, its cost from the
+            # start, the action that led to it, its neighbors and how
+            # many of those have been tried
+            stack = [[start, 0, None, self.neighbors(start), 0]]
+            on_path = {start}
+            self.num_explored += 1
+            if start == goal:
+                break
+
+            while stack:
+                frame = stack[-1]
+                state, cost, _, children, tried = frame
+                if tried == len(children):
+                    stack.pop()
+                    on_path.discard(state)
+                    continue
+                frame[4] += 1
 
-                # Start
-                elif (i, j) == self.start:
-                    fill = (255, 0, 0)
+                action, child = children[tried]
+                if child in on_path:
+                    continue
+                child_cost = cost + self.cost(child)
+                total = child_cost + estimate(child)
+                if total > bound:
+                    next_bound = min(next_bound, total)
+                    continue
 
-                # Goal
-                elif (i, j) == self.goal:
-                    fill = (0, 171, 28)
+                stack.append([child, child_cost, action, self.neighbors(child), 0])
+                on_path.add(child)
+                self.num_explored += 1
+                self.max_depth = max(self.max_depth, len(stack))
+                if child == goal:
+                    break
+            else:
+                if next_bound == math.inf:
+                    self.num_earlier_expansions = explored_before
+                    raise Exception("no solution")
+                bound = next_bound
+                continue
+            break
 
-                # Solution
-                elif solution is not None and show_solution and (i, j) in solution:
-                    fill = (220, 235, 113)
+        self.num_earlier_expansions = explored_before
+        actions = [frame[2] for frame in stack[1:]]
+        cells = [self._cell(frame[0]) for frame in stack[1:]]
+        self.solution = (actions, cells)
 
-                # Explored
-                elif solution is not None and show_explored and (i, j) in self.explored:
-                    fill = (212, 97, 85)
 
-                # Empty cell
-                else:
-                    fill = (237, 240, 252)
+    def _solve_dijkstra(self):
+        """
+        Dijkstra's algorithm with a bucket queue (Dial's algorithm).
+        Costs are small integers, so the frontier is a ring of one bucket
+        per cost from 0 to the highest cell cost: every node waiting in
+        the frontier is within that many of the current cost, and nodes
+        are taken from the buckets in cost order without any heap.
+        """
+        self.num_explored = 0
+        self.explored = set()
+        start = self._state(self.start)
+        goal = self._state(self.goal)
 
-                # Draw cell
-                draw.rectangle(
-                    ([(j * cell_size + cell_border, i * cell_size + cell_border),
-                      ((j + 1) * cell_size - cell_border, (i + 1) * cell_size - cell_border)]),
-                    fill=fill
-                )
+        buckets = [[] for _ in range(self.max_cost() + 1)]
+        buckets[0].append(Node(state=start, parent=None, action=None))
+        waiting = 1
 
+        # Cheapest known cost from the start to each reached state
+        costs = {start: 0}
+
+        cost = 0
+        while waiting:
+            bucket = buckets[cost % len(buckets)]
+            while bucket:
+                node = bucket.pop()
+                waiting -= 1
+
+                # Skip nodes superseded by a cheaper path to their state
+                if node.state in self.explored or costs[node.state] < cost:
+                    continue
+                self.num_explored += 1
+
+                if node.state == goal:
+                    self.solution = self._backtrack(node)
+                    return
+
+                self.explored.add(node.state)
+
+                for action, state in self.neighbors(node.state):
+                    child_cost = cost + self.cost(state)
+                    if child_cost < costs.get(state, child_cost + 1):
+                        costs[state] = child_cost
+                        child = Node(state=state, parent=node, action=action, cost=child_cost)
+                        buckets[child_cost % len(buckets)].append(child)
+                        waiting += 1
+            cost += 1
+
+        raise Exception("no solution")
+
+
+    def _solve_jps(self):
+        """
+        Jump Point Search: A* that only pushes jump points onto the
+        frontier, skipping over the cells of straight corridors and open
+        rows that have no new openings beside them. Each expanded jump
+        point counts towards `num_explored`, and the solution lists every
+        cell walked through, just like the other solvers.
+        """
+        self.num_explored = 0
+        self.explored = set()
+        frontier = PriorityFrontier()
+        frontier.add(Node(state=self.start, parent=None, action=None))
+
+        # Cheapest known cost from the start to each jump point
+        costs = {self.start: 0}
+
+        while True:
+            if frontier.empty():
+                raise Exception("no solution")
+
+            node = frontier.remove()
+            self.num_explored += 1
+
+            if node.state == self.goal:
+                self.solution = self._walk_jumps(node)
+                return
+
+            self.explored.add(self._state(node.state))
+
+            for action in self._jump_directions(node):
+                row, col = node.state
+                jump_point = self._jump(row, col, *DIRECTIONS[action])
+                if jump_point is None:
+                    continue
+                cost = node.cost + manhattan(node.state, jump_point)
+                if cost < costs.get(jump_point, cost + 1):
+                    costs[jump_point] = cost
+                    child = Node(state=jump_point, parent=node, action=action, cost=cost)
+                    frontier.add(child, cost + manhattan(jump_point, self.goal))
+
+
+    def _jump_directions(self, node):
+        """
+        Returns the directions worth jumping in from `node`: every way out
+        of the start, otherwise straight on and the two turns, never back.
+        """
+        if node.action is None:
+            directions = ("up", "down", "left", "right")
+        elif node.action in ("left", "right"):
+            directions = ("up", "down", node.action)
+        else:
+            directions = ("left", "right", node.action)
+
+        row, col = node.state
+        return [
+            action for action in directions
+            if self.is_open(row + DIRECTIONS[action][0], col + DIRECTIONS[action][1])
+        ]
+
+
+    def _jump(self, row, col, d_row, d_col):
+        """
+        Steps from (row, col) in direction (d_row, d_col) until reaching
+        the goal or a cell with a forced neighbor, returning that cell,
+        or None if a wall is hit first. Vertical jumps also stop wherever
+        a horizontal jump from the cell would find a jump point.
+        """
+        is_open = self.is_open
+        while True:
+            row += d_row
+            col += d_col
+            if not is_open(row, col):
+                return None
+            if (row, col) == self.goal:
+                return (row, col)
+
+            if d_row == 0:
+                if ((is_open(row - 1, col) and not is_open(row - 1, col - d_col))
+                        or (is_open(row + 1, col) and not is_open(row + 1, col - d_col))):
+                    return (row, col)
+            else:
+                if ((is_open(row, col - 1) and not is_open(row - d_row, col - 1))
+                        or (is_open(row, col + 1) and not is_open(row - d_row, col + 1))):
+                    return (row, col)
+                if self._jump(row, col, 0, 1) or self._jump(row, col, 0, -1):
+                    return (row, col)
+
+
+    def _walk_jumps(self, node):
+        """
+        Returns the (actions, cells) that lead from the start to `node`,
+        filling in every cell between consecutive jump points.
+        """
+        actions = []
+        cells = []
+        while node.parent is not None:
+            d_row, d_col = DIRECTIONS[node.action]
+            row, col = node.state
+            for _ in range(manhattan(node.parent.state, node.state)):
+                actions.append(node.action)
+                cells.append((row, col))
+                row -= d_row
+                col -= d_col
+            node = node.parent
+        actions.reverse()
+        cells.reverse()
+        return (actions, cells)
+
+
+    def distance_field(self, goal=None, cache_dir=None):
+        """
+        Returns a NumPy array holding, for every cell, the number of steps
+        to `goal` (the maze's own goal by default), or -1 where the goal
+        cannot be reached. The field is found with one breadth-first
+        wavefront from the goal, each layer grown in a single vectorized
+        step, and kept in `self.field` for `path_from_field`.
+
+        With `cache_dir`, fields are saved there keyed by a hash of the
+        walls and goal, and later calls for the same maze load them back.
+        """
+        import numpy as np
+
+        goal = self.goal if goal is None else tuple(goal)
+        if self.is_wall(goal):
+            raise ValueError(f"goal {goal} is a wall")
+        walls, stride = self._padded_walls()
+
+        filename = None
+        if cache_dir is not None:
+            digest = hashlib.sha256()
+            digest.update(struct.pack("<4I", self.height, self.width, *goal))
+            digest.update(walls.tobytes())
+            filename = os.path.join(cache_dir, f"{digest.hexdigest()}.npy")
+
+        if filename is not None and os.path.exists(filename):
+            field = np.load(filename)
+        else:
+            distances = np.full(walls.size, -1, dtype=np.int32)
+            offsets = np.array([-stride, stride, -1, 1])
+            frontier = np.array([(goal[0] + 1) * stride + goal[1] + 1])
+            distances[frontier] = 0
+            distance = 0
+            while frontier.size:
+                distance += 1
+                reached = (frontier[:, None] + offsets).ravel()
+                reached = np.unique(reached[(walls[reached] == 0) & (distances[reached] < 0)])
+                distances[reached] = distance
+                frontier = reached
+
+            # The border of walls makes every move from the edge land on a
+            # wall, so no bounds checks were needed; drop it now
+            field = distances.reshape(self.height + 2, stride)[1:-1, 1:-1].copy()
+            if filename is not None:
+                os.makedirs(cache_dir, exist_ok=True)
+                np.save(filename, field)
+
+        self.field = field
+        self.field_goal = goal
+        return field
+
+
+    def path_from_field(self, start=None):
+        """
+        Returns the (actions, cells) from `start` (the maze's own start by
+        default) to the goal of the last `distance_field`, by repeatedly
+        stepping to a neighbor one step closer. No search is needed.
+        """
+        start = self.start if start is None else tuple(start)
+        field = self.field
+        distance = field[start]
+        if self.is_wall(start) or distance < 0:
+            raise Exception("no solution")
+
+        actions = []
+        cells = []
+        row, col = start
+        while distance > 0:
+            for action, (d_row, d_col) in DIRECTIONS.items():
+                r, c = row + d_row, col + d_col
+                if 0 <= r < self.height and 0 <= c < self.width and field[r, c] == distance - 1:
+                    break
+            actions.append(action)
+            cells.append((r, c))
+            row, col = r, c
+            distance -= 1
+        return (actions, cells)
+
+
+    def _padded_walls(self):
+        """
+        Returns the walls as a flat NumPy array of 0s and 1s, wrapped in a
+        border of walls like `CompactMaze`, along with its row stride.
+        """
+        import numpy as np
+        walls = np.array(self.walls, dtype=np.uint8)
+        walls = np.pad(walls.reshape(self.height, self.width), 1, constant_values=1)
+        return walls.ravel(), self.width + 2
+
+
+    def _backtrack(self, node):
+        """Returns the (actions, cells) that lead from the start to `node`."""
+        actions = []
+        cells = []
+        while node.parent is not None:
+            actions.append(node.action)
+            cells.append(self._cell(node.state))
+            node = node.parent
+        actions.reverse()
+        cells.reverse()
+        return (actions, cells)
+
+
+    def output_image(self, filename, show_solution=True, show_explored=False,
+                     cell_size=50, cell_border=2):
+        """
+        Saves a picture of the maze to `filename`. The whole grid is
+        colored at once as a NumPy array of one palette index per cell,
+        then scaled up to `cell_size` pixels a cell, with a black gap of
+        `cell_border` pixels between cells.
+        """
+        import numpy as np
+        from PIL import Image
+
+        walls, stride = self._padded_walls()
+        walls = walls.reshape(self.height + 2, stride)[1:-1, 1:-1]
+        cells = np.where(walls, WALL_COLOR, EMPTY_COLOR).astype(np.uint8)
+
+        if self.solution is not None:
+            if show_explored:
+                cells[self._mask(self.explored) & (cells == EMPTY_COLOR)] = EXPLORED_COLOR
+            if show_solution and self.solution[1]:
+                rows, cols = zip(*self.solution[1])
+                cells[rows, cols] = SOLUTION_COLOR
+        cells[self.start] = START_COLOR
+        cells[self.goal] = GOAL_COLOR
+
+        if cell_size > 1:
+            cells = cells.repeat(cell_size, axis=0).repeat(cell_size, axis=1)
+            if cell_border:
+                gap = np.zeros(cell_size, dtype=bool)
+                gap[:cell_border] = True
+                gap[cell_size - cell_border + 1:] = True
+                cells[np.tile(gap, self.height), :] = BORDER_COLOR
+                cells[:, np.tile(gap, self.width)] = BORDER_COLOR
+
+        # Save as a palette image, so the indices never need expanding to RGB
+        img = Image.new("P", (cells.shape[1], cells.shape[0]))
+        img.frombytes(np.ascontiguousarray(cells).tobytes())
+        img.putpalette([channel for color in PALETTE for channel in color])
         img.save(filename)
 
 
-if len(sys.argv) != 2:
-    sys.exit("Usage: python maze.py maze.txt")
+    def _mask(self, states):
+        """
+        Returns a NumPy boolean array marking the cells of `states`.
+        """
+        import numpy as np
+        mask = np.zeros((self.height, self.width), dtype=bool)
+        if states:
+            rows, cols = zip(*(self._cell(state) for state in states))
+            mask[rows, cols] = True
+        return mask
+
+
+class CompactMaze(Maze):
+    """
+    Maze whose walls are one flat bytearray, one byte per cell.
+
+    The grid is wrapped in a border of walls, so search states are plain
+    integer indices into the array and a cell's neighbors are found by
+    adding fixed offsets, with no bounds checks.
+    """
+
+    def __init__(self, filename, legend=None):
+        """
+        Loads a maze from a text file, or from a file written by
+        `save_binary`, without ever holding the whole file in memory.
+        A `legend` of terrain costs works as for `Maze`, for text files only;
+        the costs are kept in a second bytearray laid out like the walls.
+        """
+        legend = _check_legend(legend)
+        self.costs = None
+        with open(filename, "rb") as f:
+            if f.read(len(BINARY_MAGIC)) == BINARY_MAGIC:
+                if legend:
+                    raise ValueError("binary mazes cannot have a legend")
+                self._load_binary(f)
+            else:
+                self._load_text(f, legend)
+
+        self.offsets = (
+            ("up", -self.stride),
+            ("down", self.stride),
+            ("left", -1),
+            ("right", 1)
+        )
+        self.solution = None
+
+
+    def _load_text(self, f, legend):
+        """
+        Memory-maps a text maze and reads it in two passes over its rows:
+        one to size the grid, one to fill in the walls while looking
+        for the start and goal. Short rows are padded with open cells.
+        """
+        if os.fstat(f.fileno()).st_size == 0:
+            raise Exception("maze must have exactly one start point")
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as contents:
+
+            # Determine height and width of maze
+            self.height = 0
+            self.width = 0
+            for row in _maze_rows(contents):
+                self.height += 1
+                self.width = max(self.width, len(row))
+            self.stride = self.width + 2
+
+            # Open cells everywhere, then a row of walls above and below
+            # the maze and a wall on either end of each row
+            self.walls = bytearray(self.stride * (self.height + 2))
+            self.walls[:self.stride] = b"\x01" * self.stride
+            self.walls[-self.stride:] = b"\x01" * self.stride
+
+            # Terrain characters are open cells with their own cost
+            wall_bytes = WALL_BYTES
+            if legend:
+                wall_bytes = bytearray(WALL_BYTES)
+                cost_bytes = bytearray(b"\x01" * 256)
+                for char, cost in legend.items():
+                    wall_bytes[ord(char)] = 0
+                    cost_bytes[ord(char)] = cost
+                wall_bytes = bytes(wall_bytes)
+                cost_bytes = bytes(cost_bytes)
+                self.costs = bytearray(b"\x01") * len(self.walls)
+
+            start = None
+            goal = None
+            for i, row in enumerate(_maze_rows(contents)):
+                offset = (i + 1) * self.stride
+                self.walls[offset] = 1
+                self.walls[offset + 1:offset + 1 + len(row)] = row.translate(wall_bytes)
+                if legend:
+                    self.costs[offset + 1:offset + 1 + len(row)] = row.translate(cost_bytes)
+                self.walls[offset + self.stride - 1] = 1
+
+                # Validate start and goal as they turn up
+                j = row.find(b"A")
+                if j != -1:
+                    if start is not None or row.find(b"A", j + 1) != -1:
+                        raise Exception("maze must have exactly one start point")
+                    start = (i, j)
+                j = row.find(b"B")
+                if j != -1:
+                    if goal is not None or row.find(b"B", j + 1) != -1:
+                        raise Exception("maze must have exactly one goal")
+                    goal = (i, j)
+
+        if start is None:
+            raise Exception("maze must have exactly one start point")
+        if goal is None:
+            raise Exception("maze must have exactly one goal")
+        self.start = start
+        self.goal = goal
+
+
+    def _load_binary(self, f):
+        """Reads the rest of a maze file written by `save_binary`."""
+        self.height, self.width, *cells = struct.unpack(
+            BINARY_HEADER, f.read(struct.calcsize(BINARY_HEADER))
+        )
+        self.start = (cells[0], cells[1])
+        self.goal = (cells[2], cells[3])
+        self.stride = self.width + 2
+
+        self.walls = bytearray(b"\x01") * (self.stride * (self.height + 2))
+        row_bytes = (self.width + 7) // 8
+        for i in range(self.height):
+            bits = int.from_bytes(f.read(row_bytes), "big")
+            row = format(bits, f"0{row_bytes * 8}b")[:self.width]
+            offset = (i + 1) * self.stride + 1
+            self.walls[offset:offset + self.width] = row.encode().translate(FROM_BITS)
+
+
+    def save_binary(self, filename):
+        """
+        Writes the maze in a packed binary format: a header holding the
+        size, start and goal, then each row of walls at one bit per cell,
+        padded to a whole number of bytes.
+        """
+        row_bytes = (self.width + 7) // 8
+        padding = b"0" * (row_bytes * 8 - self.width)
+        with open(filename, "wb") as f:
+            f.write(BINARY_MAGIC)
+            f.write(struct.pack(BINARY_HEADER, self.height, self.width, *self.start, *self.goal))
+            for i in range(self.height):
+                offset = (i + 1) * self.stride + 1
+                row = self.walls[offset:offset + self.width].translate(TO_BITS)
+                f.write(int(row + padding, 2).to_bytes(row_bytes, "big"))
+
+
+    def neighbors(self, state):
+        walls = self.walls
+        return [
+            (action, state + offset)
+            for action, offset in self.offsets
+            if not walls[state + offset]
+        ]
+
+
+    def is_wall(self, cell):
+        return self.walls[self._state(cell)] == 1
+
+
+    def is_open(self, row, col):
+        # The border makes one step outside the maze read as a wall
+        return not self.walls[(row + 1) * self.stride + col + 1]
+
+
+    def set_wall(self, cell, wall):
+        self.walls[self._state(cell)] = 1 if wall else 0
+        self.solution = None
+
+
+    def region(self, top, left, height, width):
+        offsets = [(i + 1) * self.stride + left + 1 for i in range(top, top + height)]
+        walls = b"".join(self.walls[offset:offset + width] for offset in offsets)
+        if self.costs is None:
+            return walls, None
+        return walls, b"".join(self.costs[offset:offset + width] for offset in offsets)
+
+
+    def cost(self, state):
+        return self.costs[state] if self.costs is not None else 1
+
+
+    def max_cost(self):
+        return max(self.costs) if self.costs is not None else 1
+
+
+    def _state(self, cell):
+        return (cell[0] + 1) * self.stride + cell[1] + 1
+
+
+    def _cell(self, state):
+        row, col = divmod(state, self.stride)
+        return (row - 1, col - 1)
+
+
+    def _padded_walls(self):
+        import numpy as np
+        return np.frombuffer(self.walls, dtype=np.uint8), self.stride
+
+
+    def _wall_row(self, i):
+        offset = (i + 1) * self.stride + 1
+        return self.walls[offset:offset + self.width]
+
+
+    def _mask(self, states):
+        import numpy as np
+        mask = np.zeros(len(self.walls), dtype=bool)
+        if states:
+            mask[np.fromiter(states, dtype=np.int64, count=len(states))] = True
+        return mask.reshape(self.height + 2, self.stride)[1:-1, 1:-1]
+
+
+    def _heuristic(self, heuristic, goal):
+        if heuristic is not None:
+            return lambda state: heuristic(self._cell(state), self._cell(goal))
+        stride = self.stride
+        goal_row, goal_col = divmod(goal, stride)
+        return lambda state: abs(state // stride - goal_row) + abs(state % stride - goal_col)
+
+
+def solve_file(filename, algorithm="dfs", compact=False):
+    """
+    Loads and solves one maze file without rendering anything, returning
+    a dictionary of statistics: the number of states explored, the
+    solution length, the wall-clock seconds spent loading and solving,
+    and the peak memory traced while loading and solving it again. IDA*
+    also reports `max_depth` and `num_earlier_expansions`, the states it
+    expanded in iterations before its last.
+    Failures are reported under "error" rather than raised, so one bad
+    file cannot stop a batch. Files written by `save_binary` are always
+    loaded as a `CompactMaze`, as only it can read them.
+    """
+    result = {"file": filename, "algorithm": algorithm}
+    compact = compact or _is_binary(filename)
+    start = time.perf_counter()
+    m = None
+    try:
+        m = CompactMaze(filename) if compact else Maze(filename)
+        m.solve(algorithm)
+        result["num_explored"] = m.num_explored
+        result["solution_length"] = len(m.solution[0])
+        if algorithm == "idastar":
+            result["num_earlier_expansions"] = m.num_earlier_expansions
+            result["max_depth"] = m.max_depth
+    except Exception as e:
+        result["num_explored"] = getattr(m, "num_explored", None)
+        result["solution_length"] = None
+        result["error"] = str(e)
+    result["seconds"] = round(time.perf_counter() - start, 6)
+
+    # Measure memory in a second run, since tracing slows it down
+    tracemalloc.start()
+    try:
+        m = CompactMaze(filename) if compact else Maze(filename)
+        m.solve(algorithm)
+    except Exception:
+        pass
+    result["peak_memory"] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result
+
+
+def solve_batch(pattern, algorithm="dfs", compact=False, processes=None, output=sys.stdout):
+    """
+    Solves every maze file matching `pattern`, a glob or a directory of
+    .txt and .bin files, across a pool of worker processes. Writes one
+    JSON line of `solve_file` statistics per maze as each one finishes.
+    """
+    if os.path.isdir(pattern):
+        filenames = [
+            os.path.join(pattern, name) for name in sorted(os.listdir(pattern))
+            if name.endswith((".txt", ".bin"))
+        ]
+    else:
+        filenames = sorted(glob.glob(pattern))
+
+    with multiprocessing.Pool(processes) as pool:
+        tasks = [(filename, algorithm, compact) for filename in filenames]
+        for result in pool.imap_unordered(_solve_task, tasks):
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+
+
+def _is_binary(filename):
+    """
+    Returns whether a file was written by `save_binary`.
+    """
+    try:
+        with open(filename, "rb") as f:
+            return f.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+    except OSError:
+        return False
+
+
+def _solve_task(task):
+    return solve_file(*task)
+
+
+def parse_legend(text):
+    """
+    Parses a legend written as "char:cost,char:cost", e.g. "~:3,.:2".
+    """
+    legend = {}
+    for entry in text.split(","):
+        char, _, cost = entry.rpartition(":")
+        legend[char] = int(cost)
+    return legend
+
+
+def main():
+    options = [arg for arg in sys.argv[1:] if arg.startswith("--") and arg != "--batch"]
+    args = [arg for arg in sys.argv[1:] if arg not in options]
+    compact = "--compact" in options
+    legend = None
+    for option in options:
+        if option.startswith("--legend="):
+            legend = parse_legend(option[len("--legend="):])
+
+    if args and args[0] == "--batch":
+        if len(args) not in (2, 3):
+            sys.exit("Usage: python maze.py --batch directory|glob [algorithm] [--compact]")
+        solve_batch(args[1], args[2] if len(args) == 3 else "dfs", compact)
+        return
+
+    if len(args) not in (1, 2):
+        sys.exit("Usage: python maze.py maze.txt [algorithm] [--compact] [--legend=char:cost,...]")
+    algorithm = args[1] if len(args) == 2 else "dfs"
+
+    m = CompactMaze(args[0], legend) if compact else Maze(args[0], legend)
+    print("Maze:")
+    m.print()
+    print("Solving...")
+    m.solve(algorithm)
+    print("States Explored:", m.num_explored)
+    if algorithm == "bidirectional":
+        print("  From start:", m.num_explored_forward)
+        print("  From goal:", m.num_explored_backward)
+    if algorithm == "idastar":
+        print("  Iterations:", m.num_iterations)
+        print("  Before Final Iteration:", m.num_earlier_expansions)
+        print("  Deepest Path:", m.max_depth)
+    if legend:
+        print("Solution Cost:", m.solution_cost)
+    print("Solution:")
+    m.print()
+    #m.output_image("maze.png", show_explored=True)
+
 
-m = Maze(sys.argv[1])
-print("Maze:")
-m.print()
-print("Solving...")
-m.solve()
-print("States Explored:", m.num_explored)
-print("Solution:")
-m.print()
-#m.output_image("maze.png", show_explored=True)
+if __name__ == "__main__":
+    main()
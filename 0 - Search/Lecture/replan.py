@@ -0,0 +1,234 @@
+"""
+Incremental replanning for mazes whose walls change between queries.
+
+Usage: python replan.py maze.txt [changes] [seed] [--compact]
+"""
+
+import heapq
+import math
+import random
+import sys
+
+from maze import CompactMaze, Maze
+
+
+class Replanner():
+    """
+    D* Lite planner over a `Maze`.
+
+    The planner searches backward from the goal and keeps its search state
+    (`g`, the settled cost to the goal of each state, and `rhs`, the cost
+    its neighbors currently offer) between calls to `plan`. After walls
+    change through `set_wall`, only the states whose costs the change
+    affects are expanded again.
+    """
+
+    def __init__(self, maze):
+        self.maze = maze
+        self.start = maze._state(maze.start)
+        self.goal = maze._state(maze.goal)
+        self.estimate = maze._heuristic(None, self.start)
+
+        # Added to every key when the start moves, instead of requeueing
+        self.km = 0
+
+        self.g = {}
+        self.rhs = {self.goal: 0}
+
+        # Heap of (key, state) with the key each state is queued under;
+        # heap entries whose key no longer matches are stale and skipped
+        self.queue = []
+        self.keys = {}
+        self._push(self.goal)
+
+        self.num_expanded = 0
+        self.history = []
+
+
+    def plan(self):
+        """
+        Brings the search up to date and returns the (actions, cells)
+        of a cheapest path from the start to the goal. The number of
+        states expanded to do so is kept in `num_expanded` and appended
+        to `history`.
+        """
+        self.num_expanded = 0
+        self._compute_shortest_path()
+        self.history.append(self.num_expanded)
+        if self._g(self.start) == math.inf:
+            raise Exception("no solution")
+
+        # Follow the cheapest neighbor from the start down to the goal
+        actions = []
+        cells = []
+        state = self.start
+        while state != self.goal:
+            action, state = min(
+                self.maze.neighbors(state),
+                key=lambda neighbor: self.maze.cost(neighbor[1]) + self._g(neighbor[1])
+            )
+            actions.append(action)
+            cells.append(self.maze._cell(state))
+        return (actions, cells)
+
+
+    def set_wall(self, cell, wall):
+        """
+        Makes the (row, col) `cell` a wall or an open cell, and marks the
+        states whose costs may have changed for the next `plan`.
+        """
+        if wall and cell in (self.maze.start, self.maze.goal):
+            raise ValueError("the start and goal cannot be walls")
+        if self.maze.is_wall(cell) == bool(wall):
+            return
+        self.maze.set_wall(cell, wall)
+
+        state = self.maze._state(cell)
+        self._update_state(state)
+        for _, neighbor in self.maze.neighbors(state):
+            self._update_state(neighbor)
+
+
+    def move_start(self, cell):
+        """
+        Moves the start to the open (row, col) `cell`, as an agent
+        following the path would, keeping the search state.
+        """
+        state = self.maze._state(cell)
+        self.km += self.estimate(state)
+        self.start = state
+        self.maze.start = cell
+        self.estimate = self.maze._heuristic(None, state)
+
+
+    def _g(self, state):
+        return self.g.get(state, math.inf)
+
+
+    def _rhs(self, state):
+        return self.rhs.get(state, math.inf)
+
+
+    def _key(self, state):
+        cost = min(self._g(state), self._rhs(state))
+        return (cost + self.estimate(state) + self.km, cost)
+
+
+    def _push(self, state):
+        key = self._key(state)
+        self.keys[state] = key
+        heapq.heappush(self.queue, (key, state))
+
+
+    def _top(self):
+        """Returns the smallest (key, state) in the queue, or None."""
+        while self.queue:
+            key, state = self.queue[0]
+            if self.keys.get(state) == key:
+                return key, state
+            heapq.heappop(self.queue)
+        return None
+
+
+    def _update_state(self, state):
+        """
+        Recomputes `rhs` for `state` from its neighbors and queues it
+        if that leaves it inconsistent with `g`.
+        """
+        if state != self.goal:
+            if self.maze.is_wall(self.maze._cell(state)):
+                self.rhs[state] = math.inf
+            else:
+                self.rhs[state] = min(
+                    (self.maze.cost(neighbor) + self._g(neighbor)
+                     for _, neighbor in self.maze.neighbors(state)),
+                    default=math.inf
+                )
+
+        self.keys.pop(state, None)
+        if self._g(state) != self._rhs(state):
+            self._push(state)
+
+
+    def _compute_shortest_path(self):
+        while True:
+            top = self._top()
+            start_key = self._key(self.start)
+            if top is None:
+                break
+            if top[0] >= start_key and self._rhs(self.start) == self._g(self.start):
+                break
+
+            key, state = top
+            heapq.heappop(self.queue)
+            del self.keys[state]
+            self.num_expanded += 1
+
+            if key < self._key(state):
+                self._push(state)
+            elif self._g(state) > self._rhs(state):
+                self.g[state] = self._rhs(state)
+                for _, neighbor in self.maze.neighbors(state):
+                    self._update_state(neighbor)
+            else:
+                self.g[state] = math.inf
+                self._update_state(state)
+                for _, neighbor in self.maze.neighbors(state):
+                    self._update_state(neighbor)
+
+
+def compare(maze, changes=20, seed=0):
+    """
+    Toggles `changes` random cells of `maze` one at a time, often on the
+    current path, replanning after each, and prints how many states each
+    replan expanded next to how many a full A* solve of the changed maze
+    explores.
+    """
+    rng = random.Random(seed)
+    planner = Replanner(maze)
+    path = planner.plan()[1]
+    print(f"initial plan: {planner.num_expanded} expanded")
+
+    print(f"{'change':>6}  {'cell':<14}{'wall':<6}{'replan':>10}{'full A*':>10}{'length':>8}")
+    totals = [0, 0]
+    for change in range(1, changes + 1):
+        # Block the current path half the time, since changes
+        # elsewhere seldom matter
+        while True:
+            if path and rng.random() < 0.5:
+                cell = rng.choice(path)
+            else:
+                cell = (rng.randrange(maze.height), rng.randrange(maze.width))
+            if cell not in (maze.start, maze.goal):
+                break
+        wall = not maze.is_wall(cell)
+        planner.set_wall(cell, wall)
+        try:
+            path = planner.plan()[1]
+            length = len(path)
+        except Exception:
+            length = "-"
+
+        try:
+            maze.solve("astar")
+        except Exception:
+            pass
+        totals[0] += planner.num_expanded
+        totals[1] += maze.num_explored
+        print(f"{change:>6}  {str(cell):<14}{str(wall):<6}{planner.num_expanded:>10}"
+              f"{maze.num_explored:>10}{length:>8}")
+    print(f"{'total':>6}  {'':<20}{totals[0]:>10}{totals[1]:>10}")
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if arg != "--compact"]
+    if len(args) not in (1, 2, 3):
+        sys.exit(__doc__.strip().splitlines()[-1])
+    maze = CompactMaze(args[0]) if "--compact" in sys.argv else Maze(args[0])
+    changes = int(args[1]) if len(args) > 1 else 20
+    seed = int(args[2]) if len(args) > 2 else 0
+    compare(maze, changes, seed)
+
+
+if __name__ == "__main__":
+    main()
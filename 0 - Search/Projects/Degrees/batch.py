@@ -0,0 +1,140 @@
+"""
+Batch shortest path queries for degrees.py.
+
+Reads one "source,target" query per line of a CSV file, people given by
+IMDB id or by name, and writes one JSON line per answer to an output file
+as soon as it is found. Answers come in the order they are found, each
+with the line number of its query.
+
+The dataset is loaded once, before the worker processes start. Forked
+workers inherit its memory-mapped snapshot, and others map the same file,
+so every process reads the same pages and only the queries and answers
+are sent between them.
+
+Usage: python batch.py directory queries output [--processes N] [--chunk N]
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import sys
+import time
+
+import degrees
+from server import resolve
+
+# Print progress to standard error every this many seconds
+PROGRESS_INTERVAL = 5
+
+
+def read_queries(filename):
+    """
+    Yields the line number and row of each query in a CSV file.
+    """
+    with open(filename, encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        for row in reader:
+            if row:
+                yield reader.line_num, row
+
+
+def chunks(queries, size):
+    """
+    Yields lists of up to `size` queries at a time.
+    """
+    chunk = []
+    for query in queries:
+        chunk.append(query)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def answer(line, row):
+    """
+    Returns a dictionary answering one query: its line number, the
+    person_ids of the source and target, and the degrees of separation
+    and path as lists of [movie_id, person_id] (both None if they are
+    not connected). Queries that cannot be answered get an "error".
+    """
+    if len(row) != 2:
+        return {"line": line, "query": row, "error": "expected source,target"}
+    try:
+        source = resolve(row[0].strip())
+        target = resolve(row[1].strip())
+    except ValueError as e:
+        return {"line": line, "query": row, "error": str(e)}
+    path = degrees.shortest_path(source, target)
+    return {
+        "line": line,
+        "source": source,
+        "target": target,
+        "degrees": len(path) if path is not None else None,
+        "path": [list(pair) for pair in path] if path is not None else None
+    }
+
+
+def answer_chunk(chunk):
+    return [answer(line, row) for line, row in chunk]
+
+
+def run(directory, queries, output, processes=None, chunk_size=64):
+    """
+    Answers every query in the file `queries` on the dataset in
+    `directory` across `processes` worker processes, or in this process
+    if `processes` is 0, writing answers to the file `output`. Returns the
+    number of queries answered and the seconds it took.
+    """
+    degrees.load_data(directory)
+    start = time.perf_counter()
+    count = 0
+    last_report = start
+    with open(output, "w", encoding="utf-8") as f:
+        work = chunks(read_queries(queries), chunk_size)
+        pool = None
+        if processes == 0:
+            results = map(answer_chunk, work)
+        else:
+            pool = multiprocessing.Pool(processes, initializer=_load, initargs=(directory,))
+            results = pool.imap_unordered(answer_chunk, work)
+        try:
+            for answers in results:
+                for result in answers:
+                    f.write(json.dumps(result) + "\n")
+                count += len(answers)
+
+                now = time.perf_counter()
+                if now - last_report >= PROGRESS_INTERVAL:
+                    print(f"{count} queries, {count / (now - start):.1f} queries/sec", file=sys.stderr)
+                    last_report = now
+        finally:
+            if pool is not None:
+                pool.terminate()
+    return count, time.perf_counter() - start
+
+
+def _load(directory):
+    # Forked workers already have the parent's graph
+    if degrees.graph is None:
+        degrees.load_data(directory)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch shortest path queries for degrees.py.")
+    parser.add_argument("directory")
+    parser.add_argument("queries")
+    parser.add_argument("output")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--chunk", type=int, default=64)
+    args = parser.parse_args()
+
+    count, seconds = run(args.directory, args.queries, args.output, args.processes, args.chunk)
+    rate = count / seconds if seconds else 0
+    print(f"Answered {count} queries in {seconds:.2f}s ({rate:.1f} queries/sec).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""
+Benchmarks for degrees.py.
+
+Usage: python benchmark.py memory directory
+       python benchmark.py search directory [pairs] [seed]
+       python benchmark.py oracle directory [pairs] [landmarks]
+       python benchmark.py sweep directory [sources]
+       python benchmark.py names directory [names] [seed]
+"""
+
+import argparse
+import csv
+import heapq
+import os
+import random
+import time
+import tracemalloc
+
+import dataset
+import degrees
+import oracle
+from util import Node, QueueFrontier
+
+
+def load_dicts(directory):
+    """
+    The original loader, kept for comparison: returns the names, people
+    and movies dictionaries, with every person's movies and every movie's
+    stars in sets of string ids.
+    """
+    names = {}
+    people = {}
+    movies = {}
+    with open(f"{directory}/people.csv", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            people[row["id"]] = {"name": row["name"], "birth": row["birth"], "movies": set()}
+            names.setdefault(row["name"].lower(), set()).add(row["id"])
+    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            movies[row["id"]] = {"title": row["title"], "year": row["year"], "stars": set()}
+    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            try:
+                people[row["person_id"]]["movies"].add(row["movie_id"])
+                movies[row["movie_id"]]["stars"].add(row["person_id"])
+            except KeyError:
+                pass
+    return names, people, movies
+
+
+def dict_shortest_path(people, movies, source, target):
+    """
+    The original breadth-first search over the dictionaries, which builds
+    a set of (movie_id, person_id) pairs for every person it expands.
+    Returns the path's length, or None, and the number of edges scanned.
+    """
+    num_edges_scanned = 0
+    frontier = QueueFrontier()
+    frontier.add(Node(state=source, parent=None, action=None))
+    explored = set()
+    while not frontier.empty():
+        node = frontier.remove()
+        if node.state == target:
+            length = 0
+            while node.parent is not None:
+                length += 1
+                node = node.parent
+            return length, num_edges_scanned
+        explored.add(node.state)
+        neighbors = set()
+        for movie_id in people[node.state]["movies"]:
+            for person_id in movies[movie_id]["stars"]:
+                neighbors.add((movie_id, person_id))
+                num_edges_scanned += 1
+        for action, state in neighbors:
+            if not frontier.contains_state(state) and state not in explored:
+                frontier.add(Node(state=state, parent=node, action=action))
+    return None, num_edges_scanned
+
+
+def benchmark_memory(directory):
+    """
+    Prints the time and traced memory taken to load `directory` into the
+    original dictionaries and into the compiled graph. The graph's arrays
+    live in the memory-mapped snapshot, which the operating system pages
+    in as needed, so its size is shown separately.
+    """
+    print(f"{'loader':<14}{'load (s)':>10}{'traced (MB)':>14}{'mapped (MB)':>14}")
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    tables = load_dicts(directory)
+    elapsed = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0] / 2 ** 20
+    tracemalloc.stop()
+    del tables
+    print(f"{'dictionaries':<14}{elapsed:>10.3f}{memory:>14.1f}{'-':>14}")
+
+    # Compile first, so only loading the snapshot is measured
+    dataset.load(directory)
+    tracemalloc.start()
+    start = time.perf_counter()
+    graph = dataset.load(directory)
+    elapsed = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0] / 2 ** 20
+    tracemalloc.stop()
+    mapped = os.path.getsize(os.path.join(directory, dataset.SNAPSHOT)) / 2 ** 20
+    print(f"{'graph':<14}{elapsed:>10.3f}{memory:>14.1f}{mapped:>14.1f}")
+    del graph
+
+
+def random_pairs(graph, count, seed=0):
+    """
+    Returns `count` random (source, target) pairs of person_ids, drawn
+    from people who starred in at least one movie.
+    """
+    rng = random.Random(seed)
+    pairs = []
+    while len(pairs) < count:
+        pair = []
+        while len(pair) < 2:
+            person = rng.randrange(graph.num_people)
+            if graph.movies_of(person):
+                pair.append(graph.person_ids[person])
+        pairs.append(tuple(pair))
+    return pairs
+
+
+def benchmark_search(directory, count=10, seed=0):
+    """
+    Times `degrees.shortest_path` on random pairs of people, searching
+    from the source alone and from both ends, against the original search
+    over the dictionaries, checking that all three find paths of the same
+    length. Finishes with the number of edges each one scanned in total.
+    """
+    degrees.load_data(directory)
+    _, people, movies = load_dicts(directory)
+    pairs = random_pairs(degrees.graph, count, seed)
+
+    print(f"{'source':>10}{'target':>10}{'length':>8}{'dictionaries (s)':>18}"
+          f"{'one-sided (s)':>15}{'bidirectional (s)':>19}")
+    totals = [0, 0, 0]
+    edges = [0, 0, 0]
+    for source, target in pairs:
+        start = time.perf_counter()
+        length, scanned = dict_shortest_path(people, movies, source, target)
+        times = [time.perf_counter() - start]
+        edges[0] += scanned
+
+        for bidirectional in (False, True):
+            start = time.perf_counter()
+            path = degrees.shortest_path(source, target, bidirectional)
+            times.append(time.perf_counter() - start)
+            edges[len(times) - 1] += degrees.num_edges_scanned
+            if (path is None and length is not None) or (path is not None and len(path) != length):
+                raise Exception(f"path lengths differ for {source} and {target}")
+
+        for i, elapsed in enumerate(times):
+            totals[i] += elapsed
+        print(f"{source:>10}{target:>10}{str(length if length is not None else '-'):>8}"
+              f"{times[0]:>18.3f}{times[1]:>15.3f}{times[2]:>19.3f}")
+    print(f"{'total':>10}{'':>18}{totals[0]:>18.3f}{totals[1]:>15.3f}{totals[2]:>19.3f}")
+    print(f"{'edges':>10}{'':>18}{edges[0]:>18}{edges[1]:>15}{edges[2]:>19}")
+
+
+def benchmark_oracle(directory, count=100, landmarks=32):
+    """
+    Counts the random pairs of people whose degrees of separation the
+    landmark oracle's bounds settle without any search, and times
+    `degrees.degrees_of_separation` on them with and without the oracle.
+    """
+    degrees.load_data(directory)
+    pairs = random_pairs(degrees.graph, count)
+    start = time.perf_counter()
+    distance_oracle = oracle.load(directory, landmarks)
+    print(f"{len(distance_oracle.landmarks)} landmarks ready in {time.perf_counter() - start:.2f}s")
+
+    exact = 0
+    for source, target in pairs:
+        lower, upper = distance_oracle.bounds(
+            degrees.graph.person(source), degrees.graph.person(target)
+        )
+        exact += lower == upper
+    print(f"bounds settle {exact} of {len(pairs)} pairs")
+
+    print(f"{'oracle':<8}{'time (s)':>10}")
+    for loaded in (None, distance_oracle):
+        degrees.distance_oracle = loaded
+        start = time.perf_counter()
+        for source, target in pairs:
+            degrees.degrees_of_separation(source, target)
+        print(f"{str(loaded is not None):<8}{time.perf_counter() - start:>10.3f}")
+    degrees.distance_oracle = None
+
+
+def benchmark_sweep(directory, count=5):
+    """
+    Times finding the degrees of separation from random people to everyone
+    with `degrees.separation_from` against a breadth-first search that
+    loops over people, checking that both find the same distances.
+    """
+    degrees.load_data(directory)
+    sources = [source for source, _ in random_pairs(degrees.graph, count)]
+
+    print(f"{'source':>10}{'reached':>10}{'loop (s)':>10}{'arrays (s)':>12}")
+    totals = [0, 0]
+    for source in sources:
+        start = time.perf_counter()
+        expected = oracle.distances(degrees.graph, degrees.graph.person(source))
+        old = time.perf_counter() - start
+
+        start = time.perf_counter()
+        distance = degrees.separation_from(source)[0]
+        new = time.perf_counter() - start
+
+        expected = [-1 if value == oracle.UNREACHABLE else value for value in expected]
+        if distance.tolist() != expected:
+            raise Exception(f"distances differ from {source}")
+        totals[0] += old
+        totals[1] += new
+        print(f"{source:>10}{int((distance >= 0).sum()):>10}{old:>10.3f}{new:>12.3f}")
+    print(f"{'total':>10}{'':>10}{totals[0]:>10.3f}{totals[1]:>12.3f}")
+
+
+def benchmark_names(directory, count=200, seed=0):
+    """
+    Times `Graph.find_people` on the names of random people with one
+    letter dropped, doubled or swapped with the next, counting how often
+    the person's own name is among the first five found. Then checks
+    that a name with a letter dropped from one of the commonest words is
+    still found, even where that name comes late in the alphabet.
+    """
+    graph = dataset.load(directory)
+    rng = random.Random(seed)
+    found = 0
+    times = []
+    for _ in range(count):
+        name = graph.person_names[rng.randrange(graph.num_people)]
+        i = rng.randrange(len(name))
+        name, typo = name.lower(), rng.choice([
+            name[:i] + name[i + 1:],
+            name[:i] + name[i] + name[i:],
+            name[:i] + name[i + 1:i + 2] + name[i:i + 1] + name[i + 2:]
+        ])
+        start = time.perf_counter()
+        people = graph.find_people(typo, 5)
+        times.append(time.perf_counter() - start)
+        found += any(graph.person_names[person].lower() == name for person in people)
+
+    times.sort()
+    print(f"found {found} of {count} misspelt names")
+    print(f"{'mean (ms)':>10}{'p50 (ms)':>10}{'p90 (ms)':>10}{'max (ms)':>10}")
+    print(f"{1000 * sum(times) / count:>10.3f}{1000 * times[count // 2]:>10.3f}"
+          f"{1000 * times[int(0.9 * count)]:>10.3f}{1000 * times[-1]:>10.3f}")
+
+    # The names containing a word are in alphabetical order, so take the
+    # last name containing each of the commonest words
+    offsets = graph.word_offsets
+    common = heapq.nlargest(
+        10, (word for word in range(len(graph.words)) if len(graph.words[word]) > 3),
+        key=lambda word: offsets[word + 1] - offsets[word]
+    )
+    for word in common:
+        group = graph.word_names[offsets[word + 1] - 1]
+        name = graph.person_names[graph.name_order[graph.name_groups[group]]].lower()
+        common_word = graph.words[word]
+        typo = name.replace(common_word, common_word[:1] + common_word[2:], 1)
+        people = graph.find_people(typo, 5)
+        if not any(graph.person_names[person].lower() == name for person in people):
+            raise Exception(f"{typo!r} did not find {name!r}")
+    print(f"found the last names with the {len(common)} commonest words misspelt")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for degrees.py.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    memory = commands.add_parser("memory")
+    memory.add_argument("directory")
+    search = commands.add_parser("search")
+    search.add_argument("directory")
+    search.add_argument("pairs", nargs="?", type=int, default=10)
+    search.add_argument("seed", nargs="?", type=int, default=0)
+    oracle_parser = commands.add_parser("oracle")
+    oracle_parser.add_argument("directory")
+    oracle_parser.add_argument("pairs", nargs="?", type=int, default=100)
+    oracle_parser.add_argument("landmarks", nargs="?", type=int, default=32)
+    sweep = commands.add_parser("sweep")
+    sweep.add_argument("directory")
+    sweep.add_argument("sources", nargs="?", type=int, default=5)
+    names = commands.add_parser("names")
+    names.add_argument("directory")
+    names.add_argument("names", nargs="?", type=int, default=200)
+    names.add_argument("seed", nargs="?", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.command == "memory":
+        benchmark_memory(args.directory)
+    elif args.command == "search":
+        benchmark_search(args.directory, args.pairs, args.seed)
+    elif args.command == "oracle":
+        benchmark_oracle(args.directory, args.pairs, args.landmarks)
+    elif args.command == "sweep":
+        benchmark_sweep(args.directory, args.sources)
+    elif args.command == "names":
+        benchmark_names(args.directory, args.names, args.seed)
+
+
+if __name__ == "__main__":
+    main()
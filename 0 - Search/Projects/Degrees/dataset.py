@@ -0,0 +1,990 @@
+"""
+Compiled snapshot of the IMDB dataset used by degrees.py.
+
+People and movies are numbered densely in the order they appear in the
+CSV files, and who starred in what is kept in compressed sparse row (CSR)
+form: the movies of person `p` are
+
+    person_movies[person_offsets[p]:person_offsets[p + 1]]
+
+and the stars of movie `m` are found the same way from `movie_offsets`
+and `movie_people`. Ids, names, births, titles and years are kept as
+tables of strings packed into one UTF-8 blob each.
+
+People are also sorted by lowercased name, for exact and prefix lookups
+by binary search, and each distinct name `n` is shared by the people
+
+    name_order[name_groups[n]:name_groups[n + 1]]
+
+For names close to a misspelt one, the distinct names containing word
+`w` of the sorted table `words` are found the same way from
+`word_offsets` and `word_names`, and the words containing each trigram
+(run of three letters, stored as one number) of the sorted array
+`trigrams` from `trigram_offsets` and `trigram_words`, shortest words
+first.
+
+The CSV files are parsed all at once, split into chunks of rows that are
+parsed across processes.
+
+`load` writes all of this to a single binary file next to the CSVs the
+first time it is called, and memory-maps that file afterwards instead of
+parsing the CSVs again. The file records the size, modification time and
+SHA-256 hash of each CSV, and is compiled afresh when they change.
+
+Usage: python dataset.py directory [processes]
+"""
+
+import array
+import bisect
+import collections
+import csv
+import gc
+import hashlib
+import heapq
+import io
+import itertools
+import json
+import mmap
+import multiprocessing
+import os
+import struct
+import sys
+import time
+from collections.abc import Mapping
+
+# Name of the snapshot file written into the data directory
+SNAPSHOT = "compiled.bin"
+
+SNAPSHOT_MAGIC = b"DEGREES1"
+SNAPSHOT_HEADER = "<Q"
+
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+
+# The columns read from each CSV file
+COLUMNS = {
+    "people.csv": ("id", "name", "birth"),
+    "movies.csv": ("id", "title", "year"),
+    "stars.csv": ("person_id", "movie_id")
+}
+
+# CSV files are parsed in chunks of about this many bytes
+CHUNK_SIZE = 2 ** 22
+
+# A fuzzy lookup reads at most FUZZY_POSTINGS entries of the trigram
+# index for each word, rarest trigrams first and only for words up to
+# FUZZY_LENGTH letters longer or shorter, and keeps up to FUZZY_WORDS of
+# the words it finds that are at least FUZZY_SIMILARITY alike. It then
+# keeps the FUZZY_NAMES names containing the rarest two of those words
+# most often, and compares up to FUZZY_CANDIDATES of them with the name
+# looked up
+FUZZY_POSTINGS = 1000
+FUZZY_LENGTH = 2
+FUZZY_WORDS = 5
+FUZZY_SIMILARITY = 0.4
+FUZZY_NAMES = 1000
+FUZZY_CANDIDATES = 30
+
+
+class Graph():
+    """
+    The people, movies and stars of one dataset, read from the sections
+    of a snapshot. People and movies are referred to by their index;
+    `person` and `movie` look the index up from an IMDB id. `sources`
+    describes the CSV files the snapshot was compiled from.
+    """
+
+    def __init__(self, sections, sources=None):
+        self.sources = sources or {}
+        self.person_ids = _Strings(sections, "person_ids")
+        self.person_names = _Strings(sections, "person_names")
+        self.person_births = _Strings(sections, "person_births")
+        self.movie_ids = _Strings(sections, "movie_ids")
+        self.movie_titles = _Strings(sections, "movie_titles")
+        self.movie_years = _Strings(sections, "movie_years")
+
+        self.person_offsets = sections["person_offsets"]
+        self.person_movies = sections["person_movies"]
+        self.movie_offsets = sections["movie_offsets"]
+        self.movie_people = sections["movie_people"]
+
+        # Indices sorted by id, and people sorted by lowercased name,
+        # for binary searches
+        self.person_order = sections["person_order"]
+        self.movie_order = sections["movie_order"]
+        self.name_order = sections["name_order"]
+
+        # Where each distinct name starts in `name_order`, the distinct
+        # names containing each word, and the words containing each trigram
+        self.name_groups = sections["name_groups"]
+        self.words = _Strings(sections, "words")
+        self.word_lengths = sections["word_lengths"]
+        self.word_offsets = sections["word_offsets"]
+        self.word_names = sections["word_names"]
+        self.trigrams = sections["trigrams"]
+        self.trigram_offsets = sections["trigram_offsets"]
+        self.trigram_words = sections["trigram_words"]
+
+        # The connected component of each person, numbered from 0, and
+        # the number of people in each component
+        self.person_component = sections["person_component"]
+        self.component_sizes = sections["component_sizes"]
+
+    @property
+    def num_people(self):
+        return len(self.person_ids)
+
+    @property
+    def num_movies(self):
+        return len(self.movie_ids)
+
+    def person(self, person_id):
+        """
+        Returns the index of the person with the given IMDB id, or None.
+        """
+        i = _bisect(self.person_order, self.person_ids, person_id)
+        if i < len(self.person_order) and self.person_ids[self.person_order[i]] == person_id:
+            return self.person_order[i]
+        return None
+
+    def movie(self, movie_id):
+        """
+        Returns the index of the movie with the given IMDB id, or None.
+        """
+        i = _bisect(self.movie_order, self.movie_ids, movie_id)
+        if i < len(self.movie_order) and self.movie_ids[self.movie_order[i]] == movie_id:
+            return self.movie_order[i]
+        return None
+
+    def people_named(self, name):
+        """
+        Returns the indices of the people whose name is `name`,
+        ignoring case.
+        """
+        name = name.lower()
+        found = []
+        i = _bisect(self.name_order, self.person_names, name, key=str.lower)
+        while i < len(self.name_order):
+            person = self.name_order[i]
+            if self.person_names[person].lower() != name:
+                break
+            found.append(person)
+            i += 1
+        return found
+
+    def find_people(self, name, limit=10):
+        """
+        Returns the indices of up to `limit` people whose name is like
+        `name`, best first: people with exactly that name, then people
+        whose name starts with it, then people whose name is most like it
+        by trigrams. People with the same name are ordered by how many
+        movies they starred in.
+        """
+        name = name.lower()
+        found = []
+        i = _bisect(self.name_order, self.person_names, name, key=str.lower)
+        while i < len(self.name_order) and len(found) < limit:
+            group = []
+            current = self.person_names[self.name_order[i]].lower()
+            if not current.startswith(name):
+                break
+            while i < len(self.name_order) and \
+                    self.person_names[self.name_order[i]].lower() == current:
+                group.append(self.name_order[i])
+                i += 1
+            found.extend(self._by_movies(group))
+
+        if len(found) < limit:
+            seen = set(found)
+            for group in self._similar_names(name):
+                people = self.name_order[self.name_groups[group]:self.name_groups[group + 1]]
+                found.extend(person for person in self._by_movies(people) if person not in seen)
+                if len(found) >= limit:
+                    break
+        return found[:limit]
+
+    def _similar_names(self, name):
+        """
+        Returns distinct names like `name`, most similar first by the Dice
+        coefficient of their sets of trigrams. The names compared are those
+        containing the most words like the words of `name`.
+        """
+        # The names containing each word of `name` or a word like it, as
+        # slices of `word_names`, which are sorted by distinct name
+        words = []
+        for word in name.lower().split():
+            lists = [
+                self.word_names[self.word_offsets[match]:self.word_offsets[match + 1]]
+                for match in self._similar_words(word)
+            ]
+            if lists:
+                words.append(lists)
+        if not words:
+            return []
+        words.sort(key=lambda lists: sum(map(len, lists)))
+
+        # Take all the names for the rarest word and keep those that also
+        # contain the next rarest, before cutting the pool down. The lists
+        # are in alphabetical order, so cutting first would drop the names
+        # late in the alphabet however well they match
+        matched = dict.fromkeys(itertools.chain(*words[0]), 0)
+        if len(words) > 1:
+            for group in self._containing(matched, words[1]):
+                matched[group] += 1
+        pool = heapq.nlargest(FUZZY_NAMES, matched, key=matched.get)
+        matched = {group: matched[group] for group in pool}
+
+        # Rank the pool by how many of the other words they contain too
+        for lists in words[2:]:
+            for group in self._containing(matched, lists):
+                matched[group] += 1
+        # Of names containing as many of the words, the pool is still in
+        # alphabetical order, so prefer those about as long as `name`
+        names = {group: self.person_names[self.name_order[self.name_groups[group]]] for group in pool}
+        candidates = heapq.nlargest(
+            FUZZY_CANDIDATES, matched,
+            key=lambda group: (matched[group], -abs(len(names[group]) - len(name)))
+        )
+
+        grams = _trigrams(name)
+        scores = {}
+        for group in candidates:
+            other = _trigrams(names[group])
+            scores[group] = 2 * len(grams & other) / (len(grams) + len(other))
+        return sorted(scores, key=lambda group: -scores[group])
+
+    def _containing(self, pool, lists):
+        """
+        Returns the set of names in `pool` that are in any of `lists`.
+        Reading a list through is quicker than a binary search for each
+        name in the pool, unless the list is many times longer than the pool.
+        """
+        found = set()
+        for names in lists:
+            if len(names) <= 20 * len(pool):
+                found.update(pool.keys() & names)
+                continue
+            for group in pool:
+                i = bisect.bisect_left(names, group)
+                if i < len(names) and names[i] == group:
+                    found.add(group)
+        return found
+
+    def _similar_words(self, word):
+        """
+        Returns the indices of up to FUZZY_WORDS words of names like
+        `word`, the word itself first if some name contains it.
+        """
+        found = []
+        i = _bisect(range(len(self.words)), self.words, word)
+        if i < len(self.words) and self.words[i] == word:
+            found.append(i)
+
+        # Count shared trigrams from the rarest ones up, as common ones
+        # have long lists that say little about which word was meant
+        grams = _trigrams(word)
+        length = len(word)
+        postings = []
+        for gram in grams:
+            key = _trigram_key(gram)
+            i = bisect.bisect_left(self.trigrams, key)
+            if i < len(self.trigrams) and self.trigrams[i] == key:
+                words = self.trigram_words[self.trigram_offsets[i]:self.trigram_offsets[i + 1]]
+                start = bisect.bisect_left(
+                    words, length - FUZZY_LENGTH, key=self.word_lengths.__getitem__
+                )
+                end = bisect.bisect_right(
+                    words, length + FUZZY_LENGTH, key=self.word_lengths.__getitem__
+                )
+                postings.append((end - start, words, start, end))
+        postings.sort(key=lambda posting: posting[0])
+        counts = collections.Counter()
+        scanned = 0
+        for size, words, start, end in postings:
+            if scanned + size > FUZZY_POSTINGS:
+                if scanned:
+                    break
+                end = start + FUZZY_POSTINGS
+            counts.update(words[start:end])
+            scanned += size
+
+        # Compare the words sharing the most trigrams with `word`
+        best = max(counts.values(), default=0)
+        close = [other for other, count in counts.items() if count >= best - 1]
+        close.sort(key=counts.__getitem__, reverse=True)
+        scores = []
+        for other in close[:4 * FUZZY_WORDS]:
+            other_grams = _trigrams(self.words[other])
+            score = 2 * len(grams & other_grams) / (len(grams) + len(other_grams))
+            if score >= FUZZY_SIMILARITY and other not in found:
+                scores.append((score, other))
+        scores.sort(key=lambda score: -score[0])
+        found.extend(other for _, other in scores)
+        return found[:FUZZY_WORDS]
+
+    def _by_movies(self, people):
+        offsets = self.person_offsets
+        return sorted(people, key=lambda person: offsets[person] - offsets[person + 1])
+
+    def connected(self, source, target):
+        """
+        Returns whether there is any path between two people.
+        """
+        return self.person_component[source] == self.person_component[target]
+
+    def movies_of(self, person):
+        """
+        Returns the indices of the movies the person starred in.
+        """
+        return self.person_movies[self.person_offsets[person]:self.person_offsets[person + 1]]
+
+    def stars_of(self, movie):
+        """
+        Returns the indices of the people who starred in the movie.
+        """
+        return self.movie_people[self.movie_offsets[movie]:self.movie_offsets[movie + 1]]
+
+
+class People(Mapping):
+    """
+    Read-only view of a `Graph` as the `people` dictionary degrees.py
+    used to build: person_ids map to a dictionary of name, birth and
+    movies (a set of movie_ids), made when it is looked up.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, person_id):
+        person = self.graph.person(person_id)
+        if person is None:
+            raise KeyError(person_id)
+        return {
+            "name": self.graph.person_names[person],
+            "birth": self.graph.person_births[person],
+            "movies": {self.graph.movie_ids[movie] for movie in self.graph.movies_of(person)}
+        }
+
+    def __iter__(self):
+        return iter(self.graph.person_ids)
+
+    def __len__(self):
+        return self.graph.num_people
+
+
+class Movies(Mapping):
+    """
+    Read-only view of a `Graph` as the `movies` dictionary: movie_ids
+    map to a dictionary of title, year and stars (a set of person_ids).
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, movie_id):
+        movie = self.graph.movie(movie_id)
+        if movie is None:
+            raise KeyError(movie_id)
+        return {
+            "title": self.graph.movie_titles[movie],
+            "year": self.graph.movie_years[movie],
+            "stars": {self.graph.person_ids[person] for person in self.graph.stars_of(movie)}
+        }
+
+    def __iter__(self):
+        return iter(self.graph.movie_ids)
+
+    def __len__(self):
+        return self.graph.num_movies
+
+
+class Names(Mapping):
+    """
+    Read-only view of a `Graph` as the `names` dictionary: lowercased
+    names map to the set of person_ids with that name.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, name):
+        people = self.graph.people_named(name)
+        if not people or name != name.lower():
+            raise KeyError(name)
+        return {self.graph.person_ids[person] for person in people}
+
+    def __iter__(self):
+        last = None
+        for person in self.graph.name_order:
+            name = self.graph.person_names[person].lower()
+            if name != last:
+                yield name
+                last = name
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+def load(directory):
+    """
+    Returns the `Graph` of the CSV files in `directory`, memory-mapped
+    from its snapshot if that is up to date. Otherwise the CSV files are
+    compiled and the snapshot written, if the directory is writable.
+    """
+    filename = os.path.join(directory, SNAPSHOT)
+    try:
+        with open(filename, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header, sections = _unpack(buffer)
+        sources = _fresh(directory, header["sources"])
+        if sources is not None:
+            if sources != header["sources"]:
+                # Record the new modification times, so the files are
+                # not hashed again on every load
+                try:
+                    save(_restamp(buffer, header, sources), filename)
+                except OSError:
+                    pass
+            return Graph(sections, sources)
+    except (OSError, ValueError, KeyError, struct.error):
+        pass
+
+    buffer = compile_dataset(directory)
+    try:
+        save(buffer, filename)
+    except OSError:
+        pass
+    header, sections = _unpack(buffer)
+    return Graph(sections, header["sources"])
+
+
+def save(buffer, filename):
+    """
+    Writes a snapshot returned by `compile_dataset` to `filename`.
+    """
+    # Write to a temporary file first, so a crash midway
+    # never leaves a truncated snapshot behind
+    temporary = f"{filename}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(buffer)
+    os.replace(temporary, filename)
+
+
+def compile_dataset(directory, processes=None):
+    """
+    Reads the CSV files in `directory` and returns their snapshot as bytes,
+    parsing them in `processes` processes.
+    """
+    sources = {}
+    for name in SOURCES:
+        path = os.path.join(directory, name)
+        status = os.stat(path)
+        sources[name] = {
+            "size": status.st_size,
+            "mtime_ns": status.st_mtime_ns,
+            "sha256": _sha256(path)
+        }
+
+    columns = _read_columns(directory, processes)
+
+    # Load people
+    person_index = {}
+    person_ids, person_names, person_births = [], [], []
+    for person_id, name, birth in zip(*columns["people.csv"]):
+        person = person_index.setdefault(person_id, len(person_ids))
+        if person == len(person_ids):
+            person_ids.append(person_id)
+            person_names.append(name)
+            person_births.append(birth)
+        else:
+            person_names[person] = name
+            person_births[person] = birth
+
+    # Load movies
+    movie_index = {}
+    movie_ids, movie_titles, movie_years = [], [], []
+    for movie_id, title, year in zip(*columns["movies.csv"]):
+        movie = movie_index.setdefault(movie_id, len(movie_ids))
+        if movie == len(movie_ids):
+            movie_ids.append(movie_id)
+            movie_titles.append(title)
+            movie_years.append(year)
+        else:
+            movie_titles[movie] = title
+            movie_years[movie] = year
+
+    # Load stars, as one number per (person, movie) pair, skipping
+    # unknown ids and repeated rows
+    num_movies = len(movie_ids)
+    stars = set()
+    for person_id, movie_id in zip(*columns["stars.csv"]):
+        person = person_index.get(person_id)
+        movie = movie_index.get(movie_id)
+        if person is not None and movie is not None:
+            stars.add(person * num_movies + movie)
+    stars = sorted(stars)
+
+    person_offsets, person_movies, movie_offsets, movie_people = _csr(
+        len(person_ids), num_movies, stars
+    )
+    person_component, component_sizes = _components(
+        len(person_ids), movie_offsets, movie_people
+    )
+    name_order = _order(person_names, key=str.lower)
+    name_groups, words, word_offsets, word_names = _name_index(person_names, name_order)
+    word_lengths = array.array("B", (min(len(word), 255) for word in words))
+    trigrams, trigram_offsets, trigram_words = _word_index(words, word_lengths)
+
+    tables = [
+        ("person_ids", person_ids),
+        ("person_names", person_names),
+        ("person_births", person_births),
+        ("movie_ids", movie_ids),
+        ("movie_titles", movie_titles),
+        ("movie_years", movie_years),
+        ("words", words)
+    ]
+    arrays = {
+        "person_offsets": person_offsets,
+        "person_movies": person_movies,
+        "movie_offsets": movie_offsets,
+        "movie_people": movie_people,
+        "person_order": _order(person_ids),
+        "movie_order": _order(movie_ids),
+        "name_order": name_order,
+        "name_groups": name_groups,
+        "word_offsets": word_offsets,
+        "word_names": word_names,
+        "word_lengths": word_lengths,
+        "trigrams": trigrams,
+        "trigram_offsets": trigram_offsets,
+        "trigram_words": trigram_words,
+        "person_component": person_component,
+        "component_sizes": component_sizes
+    }
+    return _pack(tables, arrays, sources)
+
+
+def _read_columns(directory, processes=None):
+    """
+    Returns a dictionary of each CSV file's name to a list of the values
+    in each of its COLUMNS, in the order of its rows. Files are split into
+    chunks which are all parsed at once in a pool of `processes`
+    processes, unless they are small enough to parse in one go or this is
+    a pool's worker, which cannot start processes of its own.
+    """
+    tasks = []
+    for name, fields in COLUMNS.items():
+        path = os.path.join(directory, name)
+        columns, chunks = _chunks(path, fields)
+        tasks.extend((name, (path, start, end, columns)) for start, end in chunks)
+
+    arguments = [task for _, task in tasks]
+    if (processes or os.cpu_count() or 1) == 1 or len(tasks) <= len(COLUMNS) \
+            or multiprocessing.current_process().daemon:
+        results = itertools.starmap(_parse_chunk, arguments)
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            results = pool.starmap(_parse_chunk, arguments, chunksize=1)
+
+    # Join each file's chunks back up in order
+    values = {name: [[] for _ in fields] for name, fields in COLUMNS.items()}
+    for (name, _), result in zip(tasks, results):
+        for column, chunk in zip(values[name], result):
+            column.extend(_split_column(chunk))
+    return values
+
+
+def _chunks(path, fields, size=CHUNK_SIZE):
+    """
+    Returns the positions of `fields` in the header of a CSV file, and the
+    byte ranges of chunks of about `size` bytes of the rows after it. Each
+    chunk ends at the end of a row, not at a line break inside quotes.
+    """
+    with open(path, "rb") as f:
+        header = f.readline()
+        if not header:
+            return [], []
+        names = next(csv.reader([header.decode("utf-8")]), [])
+        if not all(field in names for field in fields):
+            raise Exception(f"{path} lacks one of the columns {', '.join(fields)}")
+        columns = [names.index(field) for field in fields]
+
+        chunks = []
+        length = os.fstat(f.fileno()).st_size
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            start = len(header)
+            while start < length:
+                end = min(start + size, length)
+                while end < length:
+                    end = data.find(b"\n", end)
+                    end = length if end == -1 else end + 1
+
+                    # A row ends at a line break with an even number of quotes
+                    # before it in the chunk, as quotes inside fields are doubled
+                    if data[start:end].count(b'"') % 2 == 0:
+                        break
+                chunks.append((start, end))
+                start = end
+    return columns, chunks
+
+
+def _parse_chunk(path, start, end, columns):
+    """
+    Returns the values in each of `columns` for the CSV rows between two
+    byte offsets of a file, joined up by `_join_column`.
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        text = f.read(end - start).decode("utf-8")
+    width = max(columns) + 1
+
+    # The rows kept cannot form reference cycles, so spare the garbage
+    # collector from scanning them over and over as they pile up
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        rows = [row for row in csv.reader(io.StringIO(text, newline=None)) if len(row) >= width]
+        return [_join_column([row[column] for row in rows]) for column in columns]
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _join_column(values):
+    """
+    Joins a list of strings into one with NUL characters between them,
+    which passes between processes far faster than the list, or returns
+    the list itself if any of them contains NUL.
+    """
+    joined = "\0".join(values)
+    if joined.count("\0") != max(len(values) - 1, 0):
+        return values
+    return len(values), joined
+
+
+def _split_column(column):
+    """
+    Returns the list of strings a column was passed as by `_join_column`.
+    """
+    if isinstance(column, list):
+        return column
+    count, joined = column
+    return joined.split("\0") if count else []
+
+
+def _csr(num_people, num_movies, stars):
+    """
+    Returns the CSR offset and index arrays of both sides of the graph
+    from the sorted `person * num_movies + movie` numbers of its edges.
+    """
+    person_counts = [0] * num_people
+    movie_counts = [0] * num_movies
+    person_movies = array.array("I", bytes(4 * len(stars)))
+    for i, star in enumerate(stars):
+        person, movie = divmod(star, num_movies)
+        person_counts[person] += 1
+        movie_counts[movie] += 1
+        person_movies[i] = movie
+
+    person_offsets = array.array("I", itertools.accumulate(person_counts, initial=0))
+    movie_offsets = array.array("I", itertools.accumulate(movie_counts, initial=0))
+
+    # Fill in each movie's stars, in order of person since `stars` is sorted
+    movie_people = array.array("I", bytes(4 * len(stars)))
+    position = movie_offsets[:-1]
+    for star in stars:
+        person, movie = divmod(star, num_movies)
+        movie_people[position[movie]] = person
+        position[movie] += 1
+    return person_offsets, person_movies, movie_offsets, movie_people
+
+
+def _components(num_people, movie_offsets, movie_people):
+    """
+    Returns the connected component of every person, numbered in order
+    of each component's first person, and the size of each component,
+    by merging the stars of each movie in a union-find forest.
+    """
+    parent = list(range(num_people))
+    size = [1] * num_people
+
+    def find(person):
+        while parent[person] != person:
+            # Halve the path on the way up, so later finds are shorter
+            parent[person] = parent[parent[person]]
+            person = parent[person]
+        return person
+
+    for movie in range(len(movie_offsets) - 1):
+        start, end = movie_offsets[movie], movie_offsets[movie + 1]
+        if start == end:
+            continue
+        root = find(movie_people[start])
+        for i in range(start + 1, end):
+            other = find(movie_people[i])
+            if other == root:
+                continue
+
+            # Hang the smaller tree under the larger one
+            if size[other] > size[root]:
+                root, other = other, root
+            parent[other] = root
+            size[root] += size[other]
+
+    person_component = array.array("I", bytes(4 * num_people))
+    component_sizes = array.array("I")
+    numbers = {}
+    for person in range(num_people):
+        root = find(person)
+        if root not in numbers:
+            numbers[root] = len(component_sizes)
+            component_sizes.append(size[root])
+        person_component[person] = numbers[root]
+    return person_component, component_sizes
+
+
+def _name_index(person_names, name_order):
+    """
+    Returns where each distinct name starts in `name_order`, with its end,
+    and the sorted words of all names with the CSR offsets and distinct
+    names of each.
+    """
+    name_groups = array.array("I")
+    postings = {}
+    last = None
+    for i, person in enumerate(name_order):
+        name = person_names[person].lower()
+        if name == last:
+            continue
+        last = name
+        for word in set(name.split()):
+            postings.setdefault(word, array.array("I")).append(len(name_groups))
+        name_groups.append(i)
+    name_groups.append(len(name_order))
+    return (name_groups, *_postings(postings))
+
+
+def _word_index(words, word_lengths):
+    """
+    Returns the sorted trigrams of `words`, with the CSR offsets and
+    indices of the words containing each, shortest first.
+    """
+    postings = {}
+    for i in sorted(range(len(words)), key=word_lengths.__getitem__):
+        for gram in _trigrams(words[i]):
+            postings.setdefault(_trigram_key(gram), array.array("I")).append(i)
+    trigrams, offsets, values = _postings(postings)
+    return array.array("Q", trigrams), offsets, values
+
+
+def _postings(postings):
+    """
+    Turns a dictionary of keys to arrays of indices into the sorted keys
+    and the CSR offsets and indices of each.
+    """
+    keys = sorted(postings)
+    offsets = array.array("I", itertools.accumulate(
+        (len(postings[key]) for key in keys), initial=0
+    ))
+    values = array.array("I")
+    for key in keys:
+        values.extend(postings[key])
+    return keys, offsets, values
+
+
+def _trigrams(name):
+    """
+    Returns the set of trigrams of a name, padded so that its first and
+    last letters count as much as the rest.
+    """
+    padded = "  " + " ".join(name.lower().split()) + " "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _trigram_key(gram):
+    """
+    Returns a trigram as one number, its three code points side by side.
+    """
+    return ord(gram[0]) << 42 | ord(gram[1]) << 21 | ord(gram[2])
+
+
+def _order(table, key=None):
+    """
+    Returns the indices of `table` in sorted order of its values.
+    """
+    if key is None:
+        order = sorted(range(len(table)), key=table.__getitem__)
+    else:
+        order = sorted(range(len(table)), key=lambda i: key(table[i]))
+    return array.array("I", order)
+
+
+def _pack(tables, arrays, sources):
+    """
+    Lays out string tables and arrays as the sections of a snapshot:
+    the magic bytes, the length of a JSON header describing where each
+    section starts, the header itself, then the sections, each aligned
+    to 8 bytes.
+    """
+    blobs = {}
+    for name, strings in tables:
+        encoded = [string.encode("utf-8") for string in strings]
+        blobs[name] = ("B", b"".join(encoded))
+        blobs[f"{name}.offsets"] = (
+            "Q", array.array("Q", itertools.accumulate(map(len, encoded), initial=0))
+        )
+    for name, values in arrays.items():
+        blobs[name] = (values.typecode, values)
+
+    directory = {}
+    position = 0
+    for name, (typecode, data) in blobs.items():
+        size = len(memoryview(data).cast("B"))
+        directory[name] = [typecode, position, size]
+        position = _align(position + size)
+    header = json.dumps({"sources": sources, "sections": directory}).encode("utf-8")
+
+    base = _align(len(SNAPSHOT_MAGIC) + struct.calcsize(SNAPSHOT_HEADER) + len(header))
+    buffer = bytearray(base + position)
+    buffer[:len(SNAPSHOT_MAGIC)] = SNAPSHOT_MAGIC
+    struct.pack_into(SNAPSHOT_HEADER, buffer, len(SNAPSHOT_MAGIC), len(header))
+    start = len(SNAPSHOT_MAGIC) + struct.calcsize(SNAPSHOT_HEADER)
+    buffer[start:start + len(header)] = header
+    for name, (typecode, data) in blobs.items():
+        _, offset, size = directory[name]
+        buffer[base + offset:base + offset + size] = memoryview(data).cast("B")
+    return buffer
+
+
+def _unpack(buffer):
+    """
+    Returns the JSON header of a snapshot and a dictionary of its
+    sections, as memoryviews into `buffer`.
+    """
+    view = memoryview(buffer)
+    if bytes(view[:len(SNAPSHOT_MAGIC)]) != SNAPSHOT_MAGIC:
+        raise ValueError("not a compiled dataset")
+    start = len(SNAPSHOT_MAGIC) + struct.calcsize(SNAPSHOT_HEADER)
+    length, = struct.unpack_from(SNAPSHOT_HEADER, view, len(SNAPSHOT_MAGIC))
+    header = json.loads(bytes(view[start:start + length]))
+    base = _align(start + length)
+    sections = {
+        name: view[base + offset:base + offset + size].cast(typecode)
+        for name, (typecode, offset, size) in header["sections"].items()
+    }
+    return header, sections
+
+
+def _restamp(buffer, header, sources):
+    """
+    Returns a copy of a snapshot with `sources` in its header instead.
+    """
+    start = len(SNAPSHOT_MAGIC) + struct.calcsize(SNAPSHOT_HEADER)
+    length, = struct.unpack_from(SNAPSHOT_HEADER, buffer, len(SNAPSHOT_MAGIC))
+    old_base = _align(start + length)
+    encoded = json.dumps({"sources": sources, "sections": header["sections"]}).encode("utf-8")
+    base = _align(start + len(encoded))
+
+    copy = bytearray(base + len(buffer) - old_base)
+    copy[:len(SNAPSHOT_MAGIC)] = SNAPSHOT_MAGIC
+    struct.pack_into(SNAPSHOT_HEADER, copy, len(SNAPSHOT_MAGIC), len(encoded))
+    copy[start:start + len(encoded)] = encoded
+    copy[base:] = buffer[old_base:]
+    return copy
+
+
+def _fresh(directory, sources):
+    """
+    Checks that the CSV files in `directory` are the ones a snapshot was
+    compiled from, returning their records with current modification
+    times if so and None otherwise. Files whose modification time changed
+    are hashed, so copying or touching them does not force a rebuild.
+    Missing files are ignored, so a snapshot can be used on its own.
+    """
+    current = {}
+    for name, recorded in sources.items():
+        current[name] = recorded
+        path = os.path.join(directory, name)
+        if not os.path.exists(path):
+            continue
+        status = os.stat(path)
+        if status.st_size != recorded["size"]:
+            return None
+        if status.st_mtime_ns != recorded["mtime_ns"]:
+            if _sha256(path) != recorded["sha256"]:
+                return None
+            current[name] = dict(recorded, mtime_ns=status.st_mtime_ns)
+    return current
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(2 ** 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _align(position):
+    return (position + 7) & ~7
+
+
+def _bisect(order, table, value, key=None):
+    """
+    Returns the first position in `order`, a list of indices into `table`
+    sorted by their values, whose value is not less than `value`.
+    """
+    low, high = 0, len(order)
+    while low < high:
+        middle = (low + high) // 2
+        current = table[order[middle]]
+        if key is not None:
+            current = key(current)
+        if current < value:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+class _Strings():
+    """
+    Sequence of the strings in one section of a snapshot, decoded from
+    its UTF-8 blob when they are read.
+    """
+
+    def __init__(self, sections, name):
+        self.blob = sections[name]
+        self.offsets = sections[f"{name}.offsets"]
+        self.count = len(self.offsets) - 1
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        sys.exit(__doc__.strip().splitlines()[-1])
+    directory = sys.argv[1]
+    processes = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    start = time.perf_counter()
+    buffer = compile_dataset(directory, processes)
+    save(buffer, os.path.join(directory, SNAPSHOT))
+    print(f"Compiled {directory} in {time.perf_counter() - start:.2f}s "
+          f"({len(buffer) / 2 ** 20:.1f} MB).")
+
+    start = time.perf_counter()
+    graph = load(directory)
+    print(f"Loaded {graph.num_people} people, {graph.num_movies} movies and "
+          f"{len(graph.person_movies)} stars in {time.perf_counter() - start:.3f}s.")
+    print(f"{len(graph.component_sizes)} connected components, the largest "
+          f"of {max(graph.component_sizes, default=0)} people.")
+
+
+if __name__ == "__main__":
+    main()
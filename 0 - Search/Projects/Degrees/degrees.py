@@ -1,7 +1,8 @@
-import csv
 import sys
+from collections import deque
 
-from util import Node, StackFrontier, QueueFrontier
+import dataset
+import oracle
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,44 +13,44 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# The compiled dataset the dictionaries above are views of, which the
+# search reads directly
+graph = None
+
+# Optional landmark distances that bound degrees of separation, see load_oracle
+distance_oracle = None
+
+# Counts from the last call to shortest_path: people taken off the
+# frontier, and movie-to-person edges read out of the graph
+num_explored = 0
+num_edges_scanned = 0
+
+# How many similar names to offer when a name is not found
+SUGGESTIONS = 5
+
 
 def load_data(directory):
     """
-    Load data from CSV files into memory.
-    """
-    # Load people
-    with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
-            }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
-            else:
-                names[row["name"].lower()].add(row["id"])
-
-    # Load movies
-    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
-                "stars": set()
-            }
-
-    # Load stars
-    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
-                pass
+    Load data from the compiled snapshot of the CSV files in `directory`,
+    compiling it first if it is missing or the CSV files have changed.
+    """
+    global graph, names, people, movies
+    graph = dataset.load(directory)
+    names = dataset.Names(graph)
+    people = dataset.People(graph)
+    movies = dataset.Movies(graph)
+
+
+def load_oracle(directory, count=32, processes=None):
+    """
+    Load the distances from `count` landmark people to everyone else,
+    finding them across `processes` processes first if they have not
+    been saved for the current dataset. They bound the degrees of
+    separation between any two people, which settles some queries
+    without searching at all.
+    """
+    global distance_oracle
+    distance_oracle = oracle.load(directory, count, processes)
 
 
 def main():
@@ -84,86 +85,209 @@ def main():
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, bidirectional=True):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
     If no possible path, returns None.
+
+    Searches from both ends at once unless `bidirectional` is False,
+    in which case it searches outward from the source alone.
     """
-    # Keep track of number of states explored 
-    num_explored = 0 
+    global num_explored, num_edges_scanned
+    num_explored = 0
+    num_edges_scanned = 0
+
+    # Search over the graph's integer indices, converting back to ids
+    # only for the path found
+    source = graph.person(source)
+    target = graph.person(target)
+    if source is None or target is None:
+        return None
 
-    # Initialize frontier to just the starting position
-    source = Node(state=source, parent=None, action=None)
-    # depth first search 
-    #frontier = StackFrontier()
-    # breadth first search 
-    frontier = QueueFrontier() 
-    frontier.add(source)
+    # People in different components are not connected, which the
+    # search would otherwise only find out by exhausting one of them
+    if not graph.connected(source, target):
+        return None
 
-    # Initialize an empty explored set
-    explored = set()
+    if bidirectional:
+        return _search_bidirectional(source, target)
+    return _search_forward(source, target)
 
-# Keep looping until solution found
-    while True:
 
-        # If nothing left in frontier, then no path
-        if frontier.empty():
-            raise Exception("no solution")
+def degrees_of_separation(source, target):
+    """
+    Returns the number of degrees of separation between the source and
+    the target, or None if they are not connected, without searching if
+    the landmark oracle's bounds on it agree.
+    """
+    source_index = graph.person(source)
+    target_index = graph.person(target)
+    if source_index is None or target_index is None:
+        return None
+    if not graph.connected(source_index, target_index):
+        return None
+    if distance_oracle is not None:
+        lower, upper = distance_oracle.bounds(source_index, target_index)
+        if lower == upper:
+            return lower
+    return len(shortest_path(source, target))
 
-        # Choose a node from the frontier
-        node = frontier.remove()
+
+def _search_forward(source, target):
+    """
+    Breadth-first search from the source, testing for the target as soon
+    as it is reached rather than when it is dequeued.
+    """
+    global num_explored, num_edges_scanned
+    if source == target:
+        return []
+
+    # Maps each person reached to the (movie, person) they were reached
+    # through, which doubles as the frontier's and explored set's index
+    parents = {source: None}
+    frontier = deque([source])
+
+    # Every star of a movie is reached the first time its cast is read,
+    # so no movie needs reading twice
+    seen_movies = set()
+
+    # Keep looping until solution found
+    while frontier:
+        person = frontier.popleft()
         num_explored += 1
 
-        # If node is the goal, then we have a solution
-        if node.state == target:
-            actions = []
-            links = []
-            while node.parent is not None:
-                actions.append(node.action)
-                links.append(node.state)
-                node = node.parent
-            actions.reverse()
-            links.reverse()
-            # something here, need to return correct list to connect 
-            combined_list = list(zip(actions, links))
-            return combined_list
-
-        # Mark node as explored
-        explored.add(node.state)
-
-        # Add neighbors to frontier
-        for action, state in neighbors_for_person(node.state):
-            if not frontier.contains_state(state) and state not in explored:
-                child = Node(state=state, parent=node, action=action)
-                frontier.add(child)
+        # Add neighbors to frontier, reading the co-stars of each movie
+        # straight out of the graph's adjacency arrays
+        for movie in graph.movies_of(person):
+            if movie in seen_movies:
+                continue
+            seen_movies.add(movie)
+            stars = graph.stars_of(movie)
+            num_edges_scanned += len(stars)
+            for star in stars:
+                if star not in parents:
+                    parents[star] = (movie, person)
+
+                    # If star is the goal, then we have a solution
+                    if star == target:
+                        return _path(parents, target)
+                    frontier.append(star)
+
+    # If nothing left in frontier, then no path
+    return None
+
+
+def _search_bidirectional(source, target):
+    """
+    Breadth-first search from the source and the target at once, a whole
+    layer at a time, always growing whichever side has the smaller
+    frontier, until one side reaches a person the other side has reached.
+    """
+    global num_explored, num_edges_scanned
+    if source == target:
+        return []
+
+    # Each side maps the people it has reached to the (movie, person)
+    # they were reached through, and keeps the movies it has read the
+    # cast of and its frontier
+    forward = [{source: None}, set(), [source]]
+    backward = [{target: None}, set(), [target]]
+
+    while forward[2] and backward[2]:
+        if len(forward[2]) <= len(backward[2]):
+            side, other = forward, backward
+        else:
+            side, other = backward, forward
+        parents, seen_movies, frontier = side
+        other_parents = other[0]
+
+        # Grow the side by one layer. No one is ever reached by both
+        # sides before this returns, so everyone the other side reached
+        # that a new person meets is on its frontier, and every join
+        # found in this layer is equally short: the first one will do
+        layer = []
+        for person in frontier:
+            num_explored += 1
+            for movie in graph.movies_of(person):
+                if movie in seen_movies:
+                    continue
+                seen_movies.add(movie)
+                stars = graph.stars_of(movie)
+                num_edges_scanned += len(stars)
+                for star in stars:
+                    if star in parents:
+                        continue
+                    parents[star] = (movie, person)
+                    if star in other_parents:
+                        return _join(forward[0], backward[0], star)
+                    layer.append(star)
+        side[2] = layer
+
+    # If either side runs out of people, then no path
+    return None
+
+
+def _join(forward, backward, meeting):
+    """
+    Returns the (movie_id, person_id) pairs from the source to the target
+    through `meeting`, given the parents each side of a bidirectional
+    search reached people through.
+    """
+    path = _path(forward, meeting)
+
+    # Follow the backward side's parents from the meeting point
+    # on towards the target
+    person = meeting
+    while backward[person] is not None:
+        movie, person = backward[person]
+        path.append((graph.movie_ids[movie], graph.person_ids[person]))
+    return path
+
+
+def _path(parents, person):
+    """
+    Returns the (movie_id, person_id) pairs that lead to `person`,
+    following `parents` back to the source.
+    """
+    path = []
+    while parents[person] is not None:
+        movie, parent = parents[person]
+        path.append((graph.movie_ids[movie], graph.person_ids[person]))
+        person = parent
+    path.reverse()
+    return path
 
 
 def person_id_for_name(name):
     """
     Returns the IMDB id for a person's name,
-    resolving ambiguities as needed.
+    resolving ambiguities and misspellings as needed.
     """
     person_ids = list(names.get(name.lower(), set()))
     if len(person_ids) == 0:
-        return None
+        # Offer the closest names, so a typo does not mean starting over
+        person_ids = [graph.person_ids[person] for person in graph.find_people(name, SUGGESTIONS)]
+        if not person_ids:
+            return None
+        print(f"No '{name}' found. Did you mean:")
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
-        for person_id in person_ids:
-            person = people[person_id]
-            name = person["name"]
-            birth = person["birth"]
-            print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
-        try:
-            person_id = input("Intended Person ID: ")
-            if person_id in person_ids:
-                return person_id
-        except ValueError:
-            pass
-        return None
     else:
         return person_ids[0]
+    for person_id in person_ids:
+        person = people[person_id]
+        name = person["name"]
+        birth = person["birth"]
+        print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
+    try:
+        person_id = input("Intended Person ID: ")
+        if person_id in person_ids:
+            return person_id
+    except ValueError:
+        pass
+    return None
 
 
 def neighbors_for_person(person_id):
@@ -171,13 +295,100 @@ def neighbors_for_person(person_id):
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
-    movie_ids = people[person_id]["movies"]
     neighbors = set()
-    for movie_id in movie_ids:
-        for person_id in movies[movie_id]["stars"]:
-            neighbors.add((movie_id, person_id))
+    for movie in graph.movies_of(graph.person(person_id)):
+        for person in graph.stars_of(movie):
+            neighbors.add((graph.movie_ids[movie], graph.person_ids[person]))
     return neighbors
 
 
+def separation_from(source):
+    """
+    Returns the degrees of separation from the source to every person in
+    one breadth-first pass, as three NumPy arrays indexed like
+    `graph.person_ids`: the distance, -1 for people not connected, and
+    a movie and person in the layer before that each person was reached
+    through, -1 for the source and for people not reached.
+
+    Each layer is found with array operations rather than a loop over
+    people, as a sparse matrix-vector product over the person-movie
+    incidence matrix would: the frontier's movies are gathered from the
+    CSR arrays, unseen ones kept, and their stars gathered in turn.
+    """
+    import numpy as np
+
+    person_offsets = np.frombuffer(graph.person_offsets, dtype=np.uint32).astype(np.int64)
+    person_movies = np.frombuffer(graph.person_movies, dtype=np.uint32).astype(np.int64)
+    movie_offsets = np.frombuffer(graph.movie_offsets, dtype=np.uint32).astype(np.int64)
+    movie_people = np.frombuffer(graph.movie_people, dtype=np.uint32).astype(np.int64)
+
+    distance = np.full(graph.num_people, -1, dtype=np.int32)
+    parent_movie = np.full(graph.num_people, -1, dtype=np.int32)
+    parent_person = np.full(graph.num_people, -1, dtype=np.int32)
+
+    # The layer each movie was reached in, and one person in the layer
+    # before who starred in it
+    movie_depth = np.full(graph.num_movies, -1, dtype=np.int32)
+    movie_parent = np.full(graph.num_movies, -1, dtype=np.int32)
+
+    source = graph.person(source)
+    if source is None:
+        raise ValueError("unknown person_id")
+    distance[source] = 0
+    frontier = np.array([source], dtype=np.int64)
+    depth = 0
+    while frontier.size:
+        depth += 1
+
+        # Every movie of the frontier that no earlier layer reached.
+        # Where a movie turns up more than once, any of the writes wins,
+        # and the layer's movies are read back off the depths, which
+        # leaves them sorted and each only once
+        movies, rows = _gather(np, person_offsets, person_movies, frontier)
+        fresh = movie_depth[movies] < 0
+        movies = movies[fresh]
+        movie_depth[movies] = depth
+        movie_parent[movies] = frontier[rows[fresh]]
+        movies = np.flatnonzero(movie_depth == depth)
+
+        # Every star of those movies that no earlier layer reached, the
+        # same way
+        stars, rows = _gather(np, movie_offsets, movie_people, movies)
+        fresh = distance[stars] < 0
+        stars = stars[fresh]
+        via = movies[rows[fresh]]
+        distance[stars] = depth
+        parent_movie[stars] = via
+        parent_person[stars] = movie_parent[via]
+        frontier = np.flatnonzero(distance == depth)
+
+    return distance, parent_movie, parent_person
+
+
+def _gather(np, offsets, values, rows):
+    """
+    Returns the values in all of `rows` of a CSR matrix concatenated, and
+    the position in `rows` of the row each came from, without a loop over
+    the rows.
+    """
+    starts = offsets[rows]
+    counts = offsets[rows + 1] - starts
+    total = int(counts.sum())
+
+    # Shift a running count so each row's positions start at its offset
+    ends = np.cumsum(counts)
+    positions = np.arange(total) + np.repeat(starts - (ends - counts), counts)
+    return values[positions], np.repeat(np.arange(rows.size), counts)
+
+
+def component_size(person_id):
+    """
+    Returns how many people are connected to a given person,
+    counting themselves.
+    """
+    person = graph.person(person_id)
+    return graph.component_sizes[graph.person_component[person]]
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,213 @@
+"""
+Landmark distance oracle for degrees.py.
+
+A few dozen of the people who starred in the most movies are picked as
+landmarks, and the degrees of separation from each landmark to everyone
+else are found by breadth-first search, in parallel across processes,
+and kept in a file next to the compiled dataset.
+
+Since degrees of separation obey the triangle inequality, the distances
+of two people to any landmark bound the distance between them:
+
+    |d(L, s) - d(L, t)|  <=  d(s, t)  <=  d(L, s) + d(L, t)
+
+and someone a landmark reaches is not connected to someone it does not.
+
+Usage: python oracle.py directory [landmarks] [processes]
+"""
+
+import array
+import hashlib
+import math
+import mmap
+import multiprocessing
+import os
+import struct
+import sys
+import time
+
+import dataset
+
+# Name of the distances file written into the data directory
+ORACLE = "landmarks.bin"
+
+ORACLE_MAGIC = b"LANDMRK2"
+
+# SHA-256 hash of the CSV files the distances were found in, the number
+# of landmarks and the number of people
+ORACLE_HEADER = "<32sII"
+
+# Distance recorded for people a landmark does not reach
+UNREACHABLE = 0xFFFF
+
+
+class LandmarkOracle():
+    """
+    Distances from each of a set of landmarks to every person, read from
+    a distances file. People are referred to by their index in the graph.
+    """
+
+    def __init__(self, buffer):
+        view = memoryview(buffer)
+        if bytes(view[:len(ORACLE_MAGIC)]) != ORACLE_MAGIC:
+            raise ValueError("not a landmark distances file")
+        start = len(ORACLE_MAGIC)
+        self.fingerprint, count, num_people = struct.unpack_from(ORACLE_HEADER, view, start)
+        start += struct.calcsize(ORACLE_HEADER)
+        self.landmarks = view[start:start + 4 * count].cast("I")
+        start = dataset._align(start + 4 * count)
+
+        # One column of distances per landmark
+        self.columns = [
+            view[start + 2 * num_people * i:start + 2 * num_people * (i + 1)].cast("H")
+            for i in range(count)
+        ]
+
+    def bounds(self, source, target):
+        """
+        Returns the (lower, upper) bounds on the degrees of separation
+        between two people. The upper bound is math.inf if no landmark
+        reaches both, and both bounds are math.inf if they are known not
+        to be connected.
+        """
+        if source == target:
+            return 0, 0
+        lower = 1
+        upper = math.inf
+        for column in self.columns:
+            to_source = column[source]
+            to_target = column[target]
+            if to_source == UNREACHABLE or to_target == UNREACHABLE:
+                if to_source != to_target:
+                    return math.inf, math.inf
+                continue
+            lower = max(lower, abs(to_source - to_target))
+            upper = min(upper, to_source + to_target)
+        return lower, upper
+
+
+def load(directory, count=32, processes=None):
+    """
+    Returns the `LandmarkOracle` of the dataset in `directory`, mapped
+    from its distances file if that was built from the same CSV files
+    with `count` landmarks. Otherwise the distances are found afresh
+    across `processes` processes and saved, if the directory is writable.
+    """
+    graph = dataset.load(directory)
+    fingerprint = _fingerprint(graph)
+    filename = os.path.join(directory, ORACLE)
+    try:
+        with open(filename, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        oracle = LandmarkOracle(buffer)
+        if oracle.fingerprint == fingerprint and len(oracle.landmarks) == min(count, graph.num_people):
+            return oracle
+    except (OSError, ValueError, struct.error):
+        pass
+
+    buffer = build(directory, graph, count, processes)
+    struct.pack_into("<32s", buffer, len(ORACLE_MAGIC), fingerprint)
+    try:
+        dataset.save(buffer, filename)
+    except OSError:
+        pass
+    return LandmarkOracle(buffer)
+
+
+def build(directory, graph, count=32, processes=None):
+    """
+    Picks `count` landmarks from `graph` and returns the contents of a
+    distances file for them, finding each one's distances in a pool of
+    `processes` processes. Forked processes share `graph`, and others map
+    the dataset in `directory`.
+    """
+    # Take the people who starred in the most movies
+    offsets = graph.person_offsets
+    landmarks = sorted(
+        range(graph.num_people), key=lambda person: offsets[person] - offsets[person + 1]
+    )[:count]
+    landmarks = array.array("I", landmarks)
+
+    num_people = graph.num_people
+    start = len(ORACLE_MAGIC) + struct.calcsize(ORACLE_HEADER)
+    base = dataset._align(start + 4 * len(landmarks))
+    buffer = bytearray(base + 2 * num_people * len(landmarks))
+    buffer[:len(ORACLE_MAGIC)] = ORACLE_MAGIC
+    struct.pack_into(ORACLE_HEADER, buffer, len(ORACLE_MAGIC), b"", len(landmarks), num_people)
+    buffer[start:start + 4 * len(landmarks)] = landmarks.tobytes()
+
+    global _graph
+    _graph = graph
+    with multiprocessing.Pool(processes, initializer=_load_graph, initargs=(directory,)) as pool:
+        for i, column in enumerate(pool.imap(_distances_task, landmarks)):
+            buffer[base + 2 * num_people * i:base + 2 * num_people * (i + 1)] = column
+    return buffer
+
+
+def distances(graph, source):
+    """
+    Returns an array of the degrees of separation from `source` to every
+    person in `graph`, with UNREACHABLE for people not connected to them.
+    """
+    distance = array.array("H", [UNREACHABLE]) * graph.num_people
+    distance[source] = 0
+    seen_movies = bytearray(graph.num_movies)
+    frontier = [source]
+    depth = 0
+    while frontier:
+        depth += 1
+        layer = []
+        for person in frontier:
+            for movie in graph.movies_of(person):
+                if seen_movies[movie]:
+                    continue
+                seen_movies[movie] = 1
+                for star in graph.stars_of(movie):
+                    if distance[star] == UNREACHABLE:
+                        distance[star] = depth
+                        layer.append(star)
+        frontier = layer
+    return distance
+
+
+def _fingerprint(graph):
+    """
+    Returns a SHA-256 hash of the hashes of the CSV files `graph` was
+    compiled from, which identifies the dataset even where its snapshot
+    could not be written to disk.
+    """
+    digest = hashlib.sha256()
+    for name in sorted(graph.sources):
+        digest.update(f"{name}:{graph.sources[name]['sha256']}\n".encode("utf-8"))
+    return digest.digest()
+
+
+# The graph each worker process finds distances in
+_graph = None
+
+
+def _load_graph(directory):
+    # Forked workers already have the parent's graph
+    global _graph
+    if _graph is None:
+        _graph = dataset.load(directory)
+
+
+def _distances_task(source):
+    return distances(_graph, source).tobytes()
+
+
+def main():
+    if len(sys.argv) not in (2, 3, 4):
+        sys.exit(__doc__.strip().splitlines()[-1])
+    directory = sys.argv[1]
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    processes = int(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    start = time.perf_counter()
+    oracle = load(directory, count, processes)
+    print(f"{len(oracle.landmarks)} landmarks ready in {time.perf_counter() - start:.2f}s.")
+
+
+if __name__ == "__main__":
+    main()
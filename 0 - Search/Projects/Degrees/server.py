@@ -0,0 +1,319 @@
+"""
+Long-running query server for degrees.py.
+
+Loads a dataset once, then answers shortest path queries over HTTP:
+
+    GET /path?source=...&target=...    people given by IMDB id or by name
+    GET /names?q=...&limit=...         people with names like q, best first
+    GET /stats                         per-query latency statistics
+
+or, with --batch, answers one "source,target" query per line of standard
+input, writing one JSON line per answer to standard output.
+
+Usage: python server.py directory [--port PORT] [--workers N] [--cache SIZE] [--batch]
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import degrees
+
+# How many of the most recent latencies percentiles are taken over
+LATENCY_WINDOW = 10000
+
+# How many similar names to offer when a name is not found
+SUGGESTIONS = 5
+
+
+class LRUCache():
+    """
+    Thread-safe mapping that holds at most `size` entries, dropping the
+    least recently used one to make room for another.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """
+        Returns (True, value) if `key` is cached, otherwise (False, None).
+        """
+        with self.lock:
+            if key not in self.entries:
+                return False, None
+            self.entries.move_to_end(key)
+            return True, self.entries[key]
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+
+class LatencyStats():
+    """
+    Counts queries and cache hits, and keeps the latencies of the most
+    recent queries for percentiles.
+    """
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.count = 0
+        self.cache_hits = 0
+        self.total = 0
+        self.latencies = deque(maxlen=window)
+        self.lock = threading.Lock()
+
+    def record(self, seconds, cached):
+        with self.lock:
+            self.count += 1
+            self.cache_hits += cached
+            self.total += seconds
+            self.latencies.append(seconds)
+
+    def summary(self):
+        """
+        Returns a dictionary of the query count, cache hits, and the mean
+        and percentiles of the latency in milliseconds.
+        """
+        with self.lock:
+            latencies = sorted(self.latencies)
+            summary = {"queries": self.count, "cache_hits": self.cache_hits}
+            if not latencies:
+                return summary
+            summary["mean_ms"] = 1000 * self.total / self.count
+            for name, fraction in (("p50_ms", 0.5), ("p90_ms", 0.9), ("p99_ms", 0.99)):
+                summary[name] = 1000 * latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+            summary["max_ms"] = 1000 * latencies[-1]
+            return summary
+
+
+class QueryService():
+    """
+    Answers shortest path queries on the dataset in `directory`.
+
+    Searches run in a pool of `workers` processes, each of which maps the
+    compiled dataset for itself, so slow queries do not hold up others.
+    With `workers` of 0 they run in the calling thread instead. Answers
+    are cached by the unordered pair of people, so a query in either
+    direction hits the cache.
+    """
+
+    def __init__(self, directory, workers=None, cache_size=10000):
+        degrees.load_data(directory)
+        self.pool = None
+        if workers != 0:
+            self.pool = ProcessPoolExecutor(
+                workers, initializer=degrees.load_data, initargs=(directory,)
+            )
+        self.cache = LRUCache(cache_size)
+        self.stats = LatencyStats()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+
+    def query(self, source, target):
+        """
+        Returns a dictionary answering one query: the person_ids of the
+        source and target, the degrees of separation and path as lists
+        of [movie_id, person_id] (both None if not connected), whether
+        the answer was cached and the seconds it took.
+        """
+        start = time.perf_counter()
+        source = resolve(source)
+        target = resolve(target)
+
+        key = frozenset((source, target))
+        cached, value = self.cache.get(key)
+        if cached:
+            origin, path = value
+            if path is not None and origin != source:
+                path = reverse_path(origin, path)
+        else:
+            if self.pool is None:
+                path = degrees.shortest_path(source, target)
+            else:
+                path = self.pool.submit(degrees.shortest_path, source, target).result()
+            self.cache.put(key, (source, path))
+
+        seconds = time.perf_counter() - start
+        self.stats.record(seconds, cached)
+        return {
+            "source": source,
+            "target": target,
+            "degrees": len(path) if path is not None else None,
+            "path": [list(pair) for pair in path] if path is not None else None,
+            "cached": cached,
+            "seconds": seconds
+        }
+
+
+def resolve(person):
+    """
+    Returns the person_id of `person`, an IMDB id or a name, in the data
+    degrees.py has loaded. Raises ValueError for unknown or ambiguous
+    names, suggesting similar names for unknown ones.
+    """
+    if degrees.graph.person(person) is not None:
+        return person
+    matches = degrees.graph.people_named(person)
+    if len(matches) == 1:
+        return degrees.graph.person_ids[matches[0]]
+    if not matches:
+        suggestions = "; ".join(
+            f"{match['name']} ({match['id']})" for match in similar_names(person, SUGGESTIONS)
+        )
+        if suggestions:
+            raise ValueError(f"person not found: {person} (did you mean {suggestions}?)")
+        raise ValueError(f"person not found: {person}")
+    person_ids = ", ".join(degrees.graph.person_ids[match] for match in matches)
+    raise ValueError(f"ambiguous name: {person} (ids {person_ids})")
+
+
+def similar_names(name, limit=10):
+    """
+    Returns up to `limit` people with names like `name`, best first,
+    as dictionaries of their id, name and birth.
+    """
+    graph = degrees.graph
+    return [
+        {"id": graph.person_ids[person], "name": graph.person_names[person],
+         "birth": graph.person_births[person]}
+        for person in graph.find_people(name, limit)
+    ]
+
+
+def reverse_path(source, path):
+    """
+    Turns a list of (movie_id, person_id) pairs leading from `source`
+    into the pairs leading back to it from the path's last person.
+    """
+    people = [source] + [person_id for _, person_id in path]
+    return [(path[i][0], people[i]) for i in range(len(path) - 1, -1, -1)]
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        arguments = {name: values[0] for name, values in parse_qs(url.query).items()}
+        service = self.server.service
+        if url.path == "/path":
+            try:
+                answer = service.query(arguments["source"], arguments["target"])
+            except KeyError as e:
+                self._reply(400, {"error": f"missing parameter: {e.args[0]}"})
+            except ValueError as e:
+                self._reply(400, {"error": str(e)})
+            else:
+                self._reply(200, answer)
+        elif url.path == "/names":
+            try:
+                limit = int(arguments.get("limit", 10))
+                self._reply(200, similar_names(arguments["q"], limit))
+            except KeyError as e:
+                self._reply(400, {"error": f"missing parameter: {e.args[0]}"})
+            except ValueError:
+                self._reply(400, {"error": "limit must be a number"})
+        elif url.path == "/stats":
+            self._reply(200, service.stats.summary())
+        else:
+            self._reply(404, {"error": f"unknown path: {url.path}"})
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def serve(service, port=8000):
+    """
+    Answers queries over HTTP on localhost until interrupted.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), QueryHandler)
+    server.service = service
+    print(f"Serving on http://127.0.0.1:{server.server_port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def answer_batch(service, lines, output=sys.stdout, threads=None):
+    """
+    Answers one "source,target" query per line, in order, writing one JSON
+    line per answer to `output`. Queries that cannot be answered are
+    written with an "error" instead.
+
+    Only a few queries per thread are in flight at once, so answers are
+    written as they are found and long inputs are never held in memory.
+    """
+    def answer(row):
+        if len(row) != 2:
+            return {"query": row, "error": "expected source,target"}
+        try:
+            return service.query(row[0].strip(), row[1].strip())
+        except ValueError as e:
+            return {"query": row, "error": str(e)}
+
+    threads = threads or (os.cpu_count() or 1) * 2
+    pending = deque()
+    with ThreadPoolExecutor(threads) as executor:
+        for row in csv.reader(lines):
+            if not row:
+                continue
+            if len(pending) == 4 * threads:
+                output.write(json.dumps(pending.popleft().result()) + "\n")
+            pending.append(executor.submit(answer, row))
+        while pending:
+            output.write(json.dumps(pending.popleft().result()) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Long-running query server for degrees.py.")
+    parser.add_argument("directory")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--cache", type=int, default=10000)
+    parser.add_argument("--batch", action="store_true")
+    args = parser.parse_args()
+
+    print("Loading data...", file=sys.stderr)
+    service = QueryService(args.directory, args.workers, args.cache)
+    print("Data loaded.", file=sys.stderr)
+    try:
+        if args.batch:
+            answer_batch(service, sys.stdin)
+            print(json.dumps(service.stats.summary()), file=sys.stderr)
+        else:
+            serve(service, args.port)
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()